@@ -1,21 +1,120 @@
 """
 A module containing helpful house keeping utilities for managing textures.
 """
+import collections
+import concurrent.futures
+import copy
+import hashlib
+import os
 import os.path
 import shutil
 import logging
+import threading
+import time
 import maya.cmds as mc
+import maya.api.OpenMaya as om
 import pymel.core as pm
 
 logger = logging.getLogger(__name__)
 
+# Number of threads used to check files on network storage
+VALIDATE_WORKERS = 8
+# Directories with fewer wanted files than this are checked with one stat per
+# file instead of listing the whole directory
+SCANDIR_MIN_FILES = 4
+# Number of files copied at the same time, and the size of each read
+COPY_WORKERS = 4
+COPY_CHUNK_SIZE = 4 * 1024 * 1024
+# Suffix of the temporary file a texture is copied to before it's renamed
+PARTIAL_SUFFIX = '.partial'
+
+
+class CopyCancelled(Exception):
+    '''
+    Description:
+        Raised in a copy worker when the copy was cancelled.
+    '''
+
+
+class CopyCollision(Exception):
+    '''
+    Description:
+        Reported for a file that wasn't copied because a different file with
+        the same name is copied to the same destination, or is already
+        there.
+    '''
+
+
+class CopyProgress(object):
+    '''
+    Description:
+        Thread-safe byte counter for a copy run, with the aggregate rate.
+    '''
+    def __init__(self, total_bytes=0, total_files=0):
+        self.total_bytes = total_bytes
+        self.total_files = total_files
+        self.copied_bytes = 0
+        self.skipped_bytes = 0
+        self.done_files = 0
+        self.start_time = time.time()
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def add_bytes(self, count):
+        with self._lock:
+            self.copied_bytes += count
+
+    def add_skipped(self, count):
+        with self._lock:
+            self.skipped_bytes += count
+
+    def file_done(self):
+        with self._lock:
+            self.done_files += 1
+
+    def bytes_per_second(self):
+        elapsed = time.time() - self.start_time
+        if elapsed <= 0:
+            return 0.0
+        return self.copied_bytes / elapsed
+
+    def percent(self):
+        if not self.total_bytes:
+            return 100
+        return int(100 * (self.copied_bytes + self.skipped_bytes)
+                   / self.total_bytes)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
 
 class MayaNode(object):
-    def __init__(self, node=None):
+    '''
+    Description:
+        Wraps a Maya node.  Attribute values are read from Maya the first
+        time they're used and then kept on the object.  The values as read
+        are remembered, so only attributes that were changed are written
+        back by set_maya_attributes().
+    '''
+    # Attributes read for all nodes at once by from_nodes()
+    PREFETCH = ()
+    # The values as they are in Maya, and the PyMEL handles used for writing,
+    # live in slots rather than __dict__, so they don't show up in data
+    __slots__ = ('__dict__', '_maya_values', '_pynode', '_attr_objs')
+
+    def __init__(self, node=None, values=None):
         if node:
             self.node = node
-            self.get_attributes()
             self.data = self.__dict__
+            self._maya_values = dict()
+            self._pynode = None
+            self._attr_objs = dict()
+            for attribute, value in (values or {}).items():
+                self._loaded(attribute, value)
 
     def __repr__(self):
         return "MayaNode('{}')".format(self.node)
@@ -23,28 +122,112 @@ class MayaNode(object):
     def __str__(self):
         return str(self.data)
 
+    def __getattr__(self, attribute):
+        # Only called for names that haven't been read yet
+        node = self.__dict__.get('node')
+        if node is None or attribute.startswith('_'):
+            raise AttributeError(attribute)
+        if not mc.attributeQuery(attribute, node=node, exists=True):
+            raise AttributeError('{} has no attribute {}'.format(node,
+                                                                attribute))
+        value = mc.getAttr('{}.{}'.format(node, attribute))
+        self._loaded(attribute, value)
+        return value
+
+    def _loaded(self, attribute, value):
+        '''
+        Description:
+            Store a value read from Maya, and remember it as unchanged.
+        '''
+        setattr(self, attribute, value)
+        self._maya_values[attribute] = copy.deepcopy(value)
+
+    @classmethod
+    def from_nodes(cls, nodes, attributes=None):
+        '''
+        Description:
+            Wrap many nodes, reading the given attributes (PREFETCH by
+            default) for all of them in one pass.
+        Parameters:
+            nodes: list of node names
+            attributes: list of attribute names to read up front
+        Returns:
+            list: the wrapped nodes
+        '''
+        if attributes is None:
+            attributes = cls.PREFETCH
+        values = dict((node, {}) for node in nodes)
+        for attribute in attributes:
+            for node, value in get_attribute_values(nodes, attribute).items():
+                values[node][attribute] = value
+        return [cls(node, values[node]) for node in nodes]
+
     def get_attributes(self):
+        '''
+        Description:
+            Read every attribute of the node that has data.
+        '''
         for attribute in mc.listAttr(self.node, hasData=True):
+            if attribute in self.__dict__:
+                continue
             try:
                 value = mc.getAttr('{}.{}'.format(self.node, attribute))
-                setattr(self, attribute, value)
+                self._loaded(attribute, value)
             except ValueError as err:
                 logging.error(err)
 
+    def changed_attributes(self):
+        '''
+        Description:
+            Find the Maya attributes whose values were changed since they
+            were read.
+        Returns:
+            dict: new value for each changed attribute
+        '''
+        return dict((attribute, self.__dict__[attribute])
+                    for attribute, value in self._maya_values.items()
+                    if self.__dict__.get(attribute, value) != value)
+
     def set_maya_attributes(self, attribute=None, value=None):
+        '''
+        Description:
+            Write the given attribute, or every attribute that was changed
+            since it was read.  Unchanged attributes and Python-only fields
+            are skipped.
+        '''
         if attribute:
-            set_maya_attribute(self.node, attribute, value)
+            changes = {attribute: value}
         else:
-            for attribute, value in self.data.items():
-                set_maya_attribute(self.node, attribute, value)
+            changes = self.changed_attributes()
+        for attribute, value in changes.items():
+            attr_obj = self._get_attr_obj(attribute)
+            if attr_obj is None:
+                continue
+            if set_attr_obj(attr_obj, value):
+                self._loaded(attribute, value)
+
+    def _get_attr_obj(self, attribute):
+        '''
+        Description:
+            Return the PyMEL attribute for writing, creating it (and the
+            PyNode) the first time.
+        '''
+        if attribute not in self._attr_objs:
+            if self._pynode is None:
+                self._pynode = pm.PyNode(self.node)
+            self._attr_objs[attribute] = get_attr_obj(self._pynode, attribute)
+        return self._attr_objs[attribute]
 
 
 class FileNode(MayaNode):
-    def __init__(self, node=None):
-        super(FileNode, self).__init__(node)
+    PREFETCH = ('fileTextureName',)
+
+    def __init__(self, node=None, values=None):
+        super(FileNode, self).__init__(node, values)
         self.file_exists = False
         self.needs_move = False
         self.new_file_path = None
+        self.copy_error = None
         self.old_path = self.fileTextureName
 
     def validate_path_location(self):
@@ -102,13 +285,28 @@ class FileNode(MayaNode):
         msg = 'The file will be copied to the new_destination'
         logging.debug('{} : {}.'.format(msg, self.new_file_path))
         new_destination = '{}/{}'.format(get_project_path(), self.new_file_path)
-        shutil.copy(self.old_path, new_destination)
+        copy_file(self.old_path, new_destination)
 
         msg = 'The file has been copied from'
         logging.debug('{} {} to {}.'.format(msg, self.old_path, self.new_file_path))
 
 # Mike
+    def copy_failed(self, error):
+        '''
+        Description:
+            Record that the texture wasn't copied, so the node keeps its
+            current path.
+        '''
+        self.copy_error = error
+        self.needs_move = False
+        self.new_file_path = None
+
     def log_summary(self):
+        if self.copy_error is not None:
+            logger.info('File {} was NOT copied: {}'.format(
+                self.fileTextureName,
+                self.copy_error))
+
         if self.needs_move is True:
             logger.info('File {} was COPIED to {}'.format(
                 self.fileTextureName,
@@ -139,6 +337,300 @@ def get_file_textures():
     return file_texture_nodes
 
 
+def validate_paths_exist(file_nodes, max_workers=VALIDATE_WORKERS):
+    '''
+    Description:
+        Check that the files of many file nodes exist, and update their
+        file_exists.  Each path is only checked once, and directories are
+        checked concurrently.  Directories with several wanted files are
+        listed once with os.scandir instead of calling stat for every file.
+    Parameters:
+        file_nodes: list of FileNode objects
+        max_workers: number of threads to use
+    Returns:
+        dict: whether each path exists
+    '''
+    directories = collections.defaultdict(set)
+    for file_node in file_nodes:
+        if file_node.old_path:
+            path = os.path.normpath(file_node.old_path)
+            directories[os.path.dirname(path)].add(os.path.basename(path))
+
+    exists = dict()
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        futures = [executor.submit(_check_directory, directory, names)
+                   for directory, names in directories.items()]
+        for future in concurrent.futures.as_completed(futures):
+            exists.update(future.result())
+
+    for file_node in file_nodes:
+        path = file_node.old_path
+        file_node.file_exists = bool(path) and exists.get(
+            os.path.normpath(path), False)
+        logging.debug('{}\nfile_exists: {}'.format(path,
+                                                   file_node.file_exists))
+    return exists
+
+
+def _check_directory(directory, names):
+    '''
+    Description:
+        Check which of the named files exist in a directory.
+    Returns:
+        dict: whether each full path exists
+    '''
+    paths = dict((name, os.path.join(directory, name)) for name in names)
+    if len(names) < SCANDIR_MIN_FILES:
+        return dict((path, os.path.isfile(path)) for path in paths.values())
+    try:
+        # normcase so names match the way the file system compares them
+        wanted = set(os.path.normcase(name) for name in names)
+        found = set(os.path.normcase(entry.name)
+                    for entry in os.scandir(directory or '.')
+                    if os.path.normcase(entry.name) in wanted
+                    and entry.is_file())
+    except FileNotFoundError:
+        found = set()
+    except OSError:
+        # The directory may not be listable even if its files can be read
+        return dict((path, os.path.isfile(path)) for path in paths.values())
+    return dict((path, os.path.normcase(name) in found)
+                for name, path in paths.items())
+
+
+def files_match(source, destination, progress=None):
+    '''
+    Description:
+        Check if the destination already holds the same content as the
+        source.  Files with the same size and modification time match;
+        files with the same size but different times are compared by hash,
+        and the destination is given the source's times if they match so the
+        next check is quick.
+    Parameters:
+        progress: optional CopyProgress to check for cancelling
+    Returns:
+        boolean: the destination matches the source
+    '''
+    try:
+        source_stat = os.stat(source)
+        destination_stat = os.stat(destination)
+    except OSError:
+        return False
+    if source_stat.st_size != destination_stat.st_size:
+        return False
+    # Some file systems only keep whole (or even) seconds
+    if abs(source_stat.st_mtime - destination_stat.st_mtime) < 2:
+        return True
+    if file_hash(source, progress) != file_hash(destination, progress):
+        return False
+    try:
+        os.utime(destination, (source_stat.st_atime, source_stat.st_mtime))
+    except OSError as err:
+        # e.g. a shared folder where the file belongs to someone else.  The
+        # content still matches; the next check just hashes again.
+        logging.debug(err)
+    return True
+
+
+def file_hash(path, progress=None):
+    '''
+    Description:
+        Hash the content of a file, reading it in chunks.
+    Parameters:
+        progress: optional CopyProgress to check for cancelling
+    '''
+    digest = hashlib.sha1()
+    with open(path, 'rb') as hash_file:
+        for chunk in iter(lambda: hash_file.read(COPY_CHUNK_SIZE), b''):
+            if progress is not None and progress.cancelled:
+                raise CopyCancelled('The copy was cancelled')
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def copy_file(source, destination, progress=None, overwrite=False):
+    '''
+    Description:
+        Copy a file through a temporary file next to the destination, which
+        is renamed into place when it's complete, so an interrupted copy
+        never leaves a partial file under the destination name.  Files that
+        are already at the destination (see files_match) aren't copied.  A
+        different file at the destination raises CopyCollision, unless
+        overwrite is set.
+    Parameters:
+        source: path to copy from
+        destination: path to copy to
+        progress: optional CopyProgress to report to and check for cancelling
+        overwrite: replace a different file at the destination
+    Returns:
+        boolean: the file was copied (False if it was already there)
+    '''
+    if progress is not None and progress.cancelled:
+        raise CopyCancelled('The copy was cancelled')
+    if files_match(source, destination, progress):
+        if progress is not None:
+            progress.add_skipped(os.path.getsize(destination))
+        return False
+    if not overwrite and os.path.exists(destination):
+        # e.g. a file with the same name copied from another folder by an
+        # earlier run
+        logger.warning('File {} was not copied because a different file is '
+                       'already at {}.'.format(source, destination))
+        raise CopyCollision(destination)
+
+    partial = destination + PARTIAL_SUFFIX
+    try:
+        with open(source, 'rb') as source_file, \
+                open(partial, 'wb') as partial_file:
+            while True:
+                if progress is not None and progress.cancelled:
+                    raise CopyCancelled('The copy was cancelled')
+                chunk = source_file.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                partial_file.write(chunk)
+                if progress is not None:
+                    progress.add_bytes(len(chunk))
+        shutil.copystat(source, partial)
+        os.replace(partial, destination)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return True
+
+
+def copy_textures(file_nodes, max_workers=COPY_WORKERS, progress=None,
+                  on_progress=None, interval=0.25, overwrite=False):
+    '''
+    Description:
+        Copy the textures of many file nodes to their new_file_path in the
+        project on a pool of worker threads.  Nodes that use the same file
+        share one copy.  If different files would be copied to the same
+        destination, only the first is copied and the others are reported
+        as CopyCollision, as are files whose destination already holds a
+        different file (unless overwrite is set).  The calling thread waits for the copies, calling
+        on_progress(progress) every interval seconds.  Copying stops early
+        if progress.cancel() is called, or on_progress returns True.
+    Parameters:
+        file_nodes: list of FileNode objects to copy
+        max_workers: number of files copied at the same time
+        progress: optional CopyProgress, e.g. to cancel from another thread
+        on_progress: optional callback for reporting progress
+        interval: seconds between on_progress calls
+        overwrite: replace different files already at the destinations
+    Returns:
+        dict: None for each FileNode that was copied (or already there), or
+        the exception that stopped its copy.  FileNodes that weren't copied
+        are also marked with copy_failed().
+    '''
+    project_path = get_project_path()
+    results = dict()
+    # Collapse the nodes into one job per destination
+    jobs = collections.OrderedDict()
+    for file_node in file_nodes:
+        source = file_node.old_path
+        destination = '{}/{}'.format(project_path, file_node.new_file_path)
+        key = os.path.normcase(os.path.normpath(destination))
+        if key not in jobs:
+            jobs[key] = (source, destination, [file_node])
+        elif _same_path(jobs[key][0], source):
+            jobs[key][2].append(file_node)
+        else:
+            logger.warning('File {} has the same name as {}, so it was not '
+                           'copied to {}.'.format(source, jobs[key][0],
+                                                  destination))
+            # Its new_file_path would point at the other file, so the node
+            # is marked as not moved
+            error = CopyCollision(jobs[key][0])
+            file_node.copy_failed(error)
+            results[file_node] = error
+    jobs = list(jobs.values())
+    if progress is None:
+        progress = CopyProgress()
+    progress.total_files = len(jobs)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        # Sizes are read on the pool too, as each stat can be slow
+        progress.total_bytes = sum(executor.map(
+            lambda job: _file_size(job[0]), jobs))
+        futures = dict()
+        for source, destination, job_nodes in jobs:
+            future = executor.submit(_copy_job, source, destination,
+                                     progress, overwrite)
+            futures[future] = job_nodes
+        pending = set(futures)
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, timeout=interval)
+            for future in done:
+                if future.cancelled():
+                    error = CopyCancelled('The copy was cancelled')
+                else:
+                    error = future.exception()
+                for file_node in futures[future]:
+                    results[file_node] = error
+            if on_progress is not None and on_progress(progress):
+                progress.cancel()
+            if progress.cancelled:
+                # Copies that haven't started yet are dropped; the running
+                # ones stop at their next chunk
+                for future in pending:
+                    future.cancel()
+
+    for file_node, error in results.items():
+        if error is None:
+            continue
+        file_node.copy_failed(error)
+        if not isinstance(error, CopyCollision):
+            logger.warning('File {} was not copied: {}'.format(
+                file_node.old_path, error))
+    logger.info('Copied {} bytes at {:.1f} MB/s, {} bytes were already '
+                'there.'.format(progress.copied_bytes,
+                                progress.bytes_per_second() / (1024 * 1024),
+                                progress.skipped_bytes))
+    return results
+
+
+def _same_path(path, other):
+    try:
+        return os.path.samefile(path, other)
+    except OSError:
+        return (os.path.normcase(os.path.normpath(path))
+                == os.path.normcase(os.path.normpath(other)))
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _copy_job(source, destination, progress, overwrite):
+    try:
+        copy_file(source, destination, progress, overwrite)
+        logging.debug('The file has been copied from {} to {}.'.format(
+            source, destination))
+    finally:
+        progress.file_done()
+
+
+def copy_progress_window(progress):
+    '''
+    Description:
+        on_progress callback for copy_textures() that shows a Maya progress
+        window, which can be cancelled with Esc.
+    Returns:
+        boolean: the user cancelled
+    '''
+    status = '{}/{} files, {:.1f} MB/s'.format(
+        progress.done_files, progress.total_files,
+        progress.bytes_per_second() / (1024 * 1024))
+    mc.progressWindow(edit=True, progress=progress.percent(), status=status)
+    return mc.progressWindow(query=True, isCancelled=True)
+
+
 def warn_copy():
     '''
     Description:
@@ -167,21 +659,93 @@ def get_project_path():
     return project_path
 
 
+def get_attribute_values(nodes, attribute):
+    '''
+    Description:
+        Read one attribute from many nodes through the API instead of one
+        getAttr command per node.  Plugs holding a string or a single number
+        are read directly; anything else falls back to getAttr.
+    Parameters:
+        nodes: list of node names
+        attribute: attribute name
+    Returns:
+        dict: value for each node that has the attribute
+    '''
+    values = dict()
+    selection = om.MSelectionList()
+    for node in nodes:
+        selection.clear()
+        try:
+            selection.add('{}.{}'.format(node, attribute))
+            plug = selection.getPlug(0)
+        except (RuntimeError, TypeError):
+            continue
+        values[node] = _read_plug(plug, node, attribute)
+    return values
+
+
+def _read_plug(plug, node, attribute):
+    '''
+    Description:
+        Read the value of a plug the way getAttr would return it.
+    '''
+    attr_obj = plug.attribute()
+    if not plug.isArray and not plug.isCompound:
+        if attr_obj.hasFn(om.MFn.kTypedAttribute):
+            attr_type = om.MFnTypedAttribute(attr_obj).attrType()
+            if attr_type == om.MFnData.kString:
+                return plug.asString()
+        elif attr_obj.hasFn(om.MFn.kEnumAttribute):
+            return plug.asInt()
+        elif attr_obj.hasFn(om.MFn.kNumericAttribute):
+            numeric_type = om.MFnNumericAttribute(attr_obj).numericType()
+            if numeric_type == om.MFnNumericData.kBoolean:
+                return plug.asBool()
+            if numeric_type in (om.MFnNumericData.kByte,
+                                om.MFnNumericData.kChar,
+                                om.MFnNumericData.kShort,
+                                om.MFnNumericData.kInt,
+                                om.MFnNumericData.kLong):
+                return plug.asInt()
+            if numeric_type in (om.MFnNumericData.kFloat,
+                                om.MFnNumericData.kDouble):
+                return plug.asDouble()
+    return mc.getAttr('{}.{}'.format(node, attribute))
+
+
 def set_maya_attribute(node, attribute, value):
-    node_obj = pm.PyNode(node)
+    attr_obj = get_attr_obj(pm.PyNode(node), attribute)
+    if attr_obj is not None:
+        set_attr_obj(attr_obj, value)
+
 
+def get_attr_obj(node_obj, attribute):
+    '''
+    Description:
+        Get the PyMEL attribute of a PyNode.
+    Returns:
+        Attribute: or None if the node doesn't have the attribute
+    '''
     # try if attr exists in node or a custom attr
     try:
         # create a PyNode attribute obj
-        attr_obj = node_obj.attr(attribute)
+        return node_obj.attr(attribute)
     except AttributeError as err:
         logging.info(err)
-        return
+        return None
 
+
+def set_attr_obj(attr_obj, value):
+    '''
+    Description:
+        Set a PyMEL attribute if it can be modified.
+    Returns:
+        boolean: the value was set
+    '''
     # check if attr_obj can be modified
     if (not attr_obj.isFreeToChange()) or (not attr_obj.isSettable()):
-        logging.debug('{} cannot be modified'.format(attribute))
-        return
+        logging.debug('{} cannot be modified'.format(attr_obj))
+        return False
 
     # check if attr value is a list
     if isinstance(value, list):
@@ -193,7 +757,8 @@ def set_maya_attribute(node, attribute, value):
         logging.info('Set attribute {} to {}'.format(attr_obj, value))
     except RuntimeError as err:
         logging.info(err)
-        return
+        return False
+    return True
 
 
 def manage_file_textures():
@@ -210,15 +775,17 @@ def manage_file_textures():
     # Get a list of all file texture nodes
     file_texture_nodes = get_file_textures()
 
-    # Wrap each file node in an object
-    file_texture_objects = list()
-    for node in file_texture_nodes:
-        file_texture_objects.append(FileNode(node))
+    # Wrap each file node in an object, reading the texture paths in one pass
+    file_texture_objects = FileNode.from_nodes(file_texture_nodes)
 
-    validated_objects = list()
     for object in file_texture_objects:
         object.validate_path_location()
-        if object.validate_path_exist():
+
+    # Check the files exist, checking the storage concurrently
+    validate_paths_exist(file_texture_objects)
+    validated_objects = list()
+    for object in file_texture_objects:
+        if object.file_exists:
             validated_objects.append(object)
 
     files_to_copy = list()
@@ -226,11 +793,16 @@ def manage_file_textures():
         if object.needs_move is True:
             files_to_copy.append(object)
 
-    if files_to_copy:
-        warn_copy()
-
-    for object in files_to_copy:
-        object.copy_texture()
+    if files_to_copy and warn_copy() == 'Yes':
+        mc.progressWindow(title='Copying Textures', progress=0,
+                          status='Starting', isInterruptable=True)
+        try:
+            copy_textures(files_to_copy, on_progress=copy_progress_window)
+        finally:
+            mc.progressWindow(endProgress=True)
+    else:
+        for object in files_to_copy:
+            object.copy_failed('Copying was declined')
 
     for object in validated_objects:
         object.set_maya_attributes()  # 'fileTextureName', object.new_file_path)
@@ -0,0 +1,223 @@
+"""
+benchmark_tween.py
+
+description:    Throughput benchmarks for tweenMachine.  benchmark_core()
+                times each stage of tween_core on random data, and
+                benchmark() runs the whole tween() path (curve discovery,
+                gathering, compute and write) against the in-memory
+                maya.cmds stand-in, so curves/second can be tracked on a
+                plain Linux box.  The stand-in's
+                commands are much cheaper than Maya's, so the numbers show
+                the Python cost of each phase and the number of commands
+                sent per curve, not the speed in a real session.  The
+                per-curve command loop that tween() used before is kept
+                here as a baseline to compare against.
+
+usage:          python tests/benchmark_tween.py [num_curves] [keys_per_curve]
+
+"""
+
+# -------------------------------------------------------------------------
+# ----------------------------------------------------------- Imports -----
+
+# Built-in
+import os
+import random
+import sys
+import time as _time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Custom
+import fake_maya
+
+tweenMac = fake_maya.load_tween_machine()
+tween_core = tweenMac.tween_core
+
+
+# -------------------------------------------------------------------------
+# --------------------------------------------------------- Functions -----
+
+def make_test_keys(num_curves, keys_per_curve, seed=0):
+    """
+    Build TMCurveKeys filled with random keys
+    """
+    rand = random.Random(seed)
+    tangents = [tween_core.TANGENT_CODES[name] for name in
+                ("spline", "linear", "clamped", "flat", "auto", "step",
+                 "fixed")]
+    keys = tween_core.TMCurveKeys()
+    for index in range(num_curves):
+        keys.curves.append("curve%d" % index)
+        keys.times.append([float(frame * 4)
+                           for frame in range(keys_per_curve)])
+        keys.values.append([rand.uniform(-10.0, 10.0)
+                            for _ in range(keys_per_curve)])
+        keys.in_tangents.append([rand.choice(tangents)
+                                 for _ in range(keys_per_curve)])
+        keys.out_tangents.append([rand.choice(tangents)
+                                  for _ in range(keys_per_curve)])
+    return keys
+
+
+def make_scene(num_curves, keys_per_curve, seed=0):
+    """
+    Make a stand-in scene with random curves spread over nodes of ten
+    attributes each, and return the list of nodes
+    """
+    scene = fake_maya.new_scene()
+    keys = make_test_keys(num_curves, keys_per_curve, seed)
+    nodes = []
+    for index in range(num_curves):
+        node = "ctrl%d" % (index // 10)
+        if not nodes or nodes[-1] != node:
+            nodes.append(node)
+        names = tween_core.TANGENT_NAMES
+        scene.add_curve(node, "attr%d" % (index % 10), keys.times[index],
+                        keys.values[index],
+                        [names[code] for code in keys.in_tangents[index]],
+                        [names[code] for code in keys.out_tangents[index]])
+    # Between two keys, in the middle of the curves
+    scene.time = keys_per_curve * 2 + 1.0
+    return nodes
+
+
+def benchmark_core(num_curves=10000, keys_per_curve=50, repeat=5):
+    """
+    Time each stage of tween_core on random data.  Returns a dictionary of
+    the best time for each stage, in curves per second.  NumPy is used when
+    it's installed.
+    """
+    keys = make_test_keys(num_curves, keys_per_curve)
+    frame = keys_per_curve * 2 + 1.0
+    stages = (
+        ("neighbours", lambda: tween_core.curve_data_at(keys, frame)),
+        ("tangents", lambda: tween_core.compute_tangents(
+            data, lambda: ("auto", "auto"))),
+        ("values", lambda: tween_core.compute_values(data, 0.33)),
+        ("tween", lambda: tween_core.compute_tween(
+            data, 0.33, lambda: ("auto", "auto"))),
+    )
+    data = tween_core.curve_data_at(keys, frame)
+    results = {}
+    for name, func in stages:
+        best = None
+        for _ in range(repeat):
+            start = _time.perf_counter()
+            func()
+            elapsed = _time.perf_counter() - start
+            if best is None or elapsed < best:
+                best = elapsed
+        results[name] = num_curves / best
+    return results
+
+
+def tween_per_curve(bias, nodes):
+    """
+    The tween() that gathered and wrote each curve with its own findKeyframe,
+    keyTangent and keyframe commands, without the Maya 2016 Extension 2
+    workaround
+    """
+    mc = tweenMac.mc
+    currenttime = mc.timeControl("timeControl1", q=True, ra=True)[0]
+    curves = mc.keyframe(nodes, q=True, name=True) or []
+    for curve in curves:
+        time_prev = mc.findKeyframe(curve, which="previous")
+        time_next = mc.findKeyframe(curve, which="next")
+        in_tan_prev = mc.keyTangent(curve, time=(time_prev,), q=True,
+                                    itt=True)[0]
+        out_tan_prev = mc.keyTangent(curve, time=(time_prev,), q=True,
+                                     ott=True)[0]
+        in_tan_next = mc.keyTangent(curve, time=(time_next,), q=True,
+                                    itt=True)[0]
+        out_tan_next = mc.keyTangent(curve, time=(time_next,), q=True,
+                                     ott=True)[0]
+        in_tan_new = out_tan_prev
+        out_tan_new = in_tan_next
+        if "fixed" in [in_tan_prev, out_tan_prev, in_tan_next,
+                       out_tan_next]:
+            in_tan_new = mc.keyTangent(q=True, g=True, itt=True)[0]
+            out_tan_new = mc.keyTangent(q=True, g=True, ott=True)[0]
+        elif out_tan_next == "step":
+            out_tan_new = out_tan_next
+        value_prev = mc.keyframe(curve, time=(time_prev,), q=True,
+                                 valueChange=True)[0]
+        value_next = mc.keyframe(curve, time=(time_next,), q=True,
+                                 valueChange=True)[0]
+        value_new = value_prev + ((value_next - value_prev) * bias)
+        mc.setKeyframe(curve, t=(currenttime,), v=value_new,
+                       ott=out_tan_new)
+        if in_tan_new != "step":
+            mc.keyTangent(curve, t=(currenttime,), itt=in_tan_new)
+
+
+def compare(num_curves=2000, keys_per_curve=50, repeat=5):
+    """
+    Time the per-curve baseline against tween() on identical stand-in
+    scenes.  Returns a dictionary mapping "before" and "after" to
+    (microseconds per curve, maya.cmds calls per curve).
+    """
+    results = {}
+    for label, func in (("before", tween_per_curve),
+                        ("after", tweenMac.tween)):
+        best = None
+        for _ in range(repeat):
+            nodes = make_scene(num_curves, keys_per_curve)
+            start = _time.perf_counter()
+            func(0.33, nodes)
+            elapsed = _time.perf_counter() - start
+            if best is None or elapsed < best:
+                best = elapsed
+            calls = sum(fake_maya.SCENE.calls.values())
+        results[label] = (best * 1e6 / num_curves,
+                          calls / float(num_curves))
+    return results
+
+
+def benchmark(num_curves=2000, keys_per_curve=50, repeat=5):
+    """
+    Time tween() on a stand-in scene.  Returns a dictionary with the best
+    curves/second for the whole call and for each profiled phase, and the
+    number of maya.cmds calls per curve.
+    """
+    nodes = make_scene(num_curves, keys_per_curve)
+    profiler = tweenMac.PROFILER
+    profiler.enabled = True
+    profiler.clear()
+    best = {}
+    try:
+        for _ in range(repeat):
+            start = _time.perf_counter()
+            tweenMac.tween(0.33, nodes)
+            elapsed = _time.perf_counter() - start
+            record = profiler.last()
+            for phase, seconds in list(record.phases.items()) + [
+                    ("total", elapsed)]:
+                if phase not in best or seconds < best[phase]:
+                    best[phase] = seconds
+            calls = sum(record.calls.values())
+    finally:
+        profiler.enabled = False
+    results = dict((phase, num_curves / seconds)
+                   for phase, seconds in best.items() if seconds)
+    results["commands_per_curve"] = calls / float(num_curves)
+    return results
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    print("core")
+    for stage, rate in sorted(benchmark_core(*args).items()):
+        print("%-12s %12.0f curves/sec" % (stage, rate))
+    print("")
+    print("tween()")
+    results = benchmark(*args)
+    commands = results.pop("commands_per_curve")
+    for stage, rate in sorted(results.items()):
+        print("%-12s %12.0f curves/sec" % (stage, rate))
+    print("%-12s %12.3f maya.cmds calls/curve" % ("commands", commands))
+    print("")
+    for label, (per_curve, calls) in sorted(compare(*args).items(),
+                                            reverse=True):
+        print("%-12s %12.2f us/curve %8.3f maya.cmds calls/curve"
+              % (label, per_curve, calls))
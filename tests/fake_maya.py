@@ -0,0 +1,585 @@
+"""
+fake_maya.py
+
+description:    In-memory stand-in for the parts of maya.cmds, maya.mel and
+                the Maya Python API that tweenMachine uses, so the tween code
+                can be tested and benchmarked without Maya.  PyMEL is only
+                stubbed, so modules that import it can be loaded.  Anim curves are
+                plain lists of key times, values and tangent names, connected
+                to "node.attr" plugs.  Every maya.cmds call is counted in
+                SCENE.calls.
+
+usage:          import fake_maya
+                tweenMac = fake_maya.load_tween_machine()
+                scene = fake_maya.new_scene()
+                scene.add_curve("pCube1", "translateX", [1, 10], [0, 5])
+
+"""
+
+# -------------------------------------------------------------------------
+# ----------------------------------------------------------- Imports -----
+
+# Built-in
+import bisect
+import collections
+import functools
+import importlib
+import importlib.util
+import os
+import sys
+import types
+
+# -------------------------------------------------------------------------
+# ----------------------------------------------------------- Globals -----
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# MFnAnimCurve tangent types, in the order of their API values.  The last one
+# isn't known to tweenMachine, like tangent types added in newer Maya versions.
+TANGENT_TYPES = ("global", "fixed", "linear", "flat", "spline", "step",
+                 "slow", "fast", "clamped", "plateau", "stepnext", "auto",
+                 "automix", "autoease", "autocustom", "futuretangent")
+API_TANGENT_NAMES = {"global": "kTangentGlobal", "fixed": "kTangentFixed",
+                     "linear": "kTangentLinear", "flat": "kTangentFlat",
+                     "spline": "kTangentSmooth", "step": "kTangentStep",
+                     "slow": "kTangentSlow", "fast": "kTangentFast",
+                     "clamped": "kTangentClamped",
+                     "plateau": "kTangentPlateau",
+                     "stepnext": "kTangentStepNext", "auto": "kTangentAuto",
+                     "automix": "kTangentAutoMix",
+                     "autoease": "kTangentAutoEase",
+                     "autocustom": "kTangentAutoCustom"}
+SCENE = None
+
+
+# -------------------------------------------------------------------------
+# --------------------------------------------------------- Functions -----
+
+def new_scene():
+    """
+    Replace the current scene with an empty one and return it
+    """
+    global SCENE
+    SCENE = FakeScene()
+    return SCENE
+
+
+def install():
+    """
+    Put the stand-in maya modules in sys.modules
+    """
+    if getattr(sys.modules.get("maya"), "__fake__", False):
+        return
+    maya = types.ModuleType("maya")
+    maya.__fake__ = True
+    maya.__path__ = []
+    api = types.ModuleType("maya.api")
+    api.__path__ = []
+    modules = {"maya": maya, "maya.api": api,
+               "maya.cmds": _make_cmds(), "maya.mel": _make_mel(),
+               "maya.utils": _make_utils(),
+               "maya.api.OpenMaya": _make_open_maya(),
+               "maya.api.OpenMayaAnim": _make_open_maya_anim(),
+               "pymel": _make_package("pymel"),
+               "pymel.core": types.ModuleType("pymel.core")}
+    for name, module in modules.items():
+        sys.modules[name] = module
+        parent, _, child = name.rpartition(".")
+        if parent:
+            setattr(modules[parent], child, module)
+
+
+def load_tween_machine():
+    """
+    Install the stand-in maya modules and import tweenMac from this
+    repository as tools.tweenMac
+    """
+    return load_module("tweenMac")
+
+
+def load_module(name):
+    """
+    Install the stand-in maya modules and import the named module from this
+    repository as tools.<name>
+    """
+    install()
+    if SCENE is None:
+        new_scene()
+    if "tools" not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            "tools", os.path.join(ROOT, "__init__.py"),
+            submodule_search_locations=[ROOT])
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["tools"] = module
+        spec.loader.exec_module(module)
+    return importlib.import_module("tools." + name)
+
+
+def _make_package(name):
+    module = types.ModuleType(name)
+    module.__path__ = []
+    return module
+
+
+def _counted(func):
+    """
+    Count every call to a maya.cmds function in the current scene
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwds):
+        SCENE.calls[func.__name__] += 1
+        return func(*args, **kwds)
+    return wrapper
+
+
+def _as_list(items):
+    if items is None:
+        return []
+    if isinstance(items, (list, tuple)):
+        return list(items)
+    return [items]
+
+
+def _unique(items):
+    return list(dict.fromkeys(items))
+
+
+# ----- maya.cmds ---------------------------------------------------------#
+
+def _make_cmds():
+    module = types.ModuleType("maya.cmds")
+    for func in (about, channelBox, currentTime, evalDeferred, findKeyframe,
+                 internalVar, keyframe, keyTangent, ls, objExists, optionVar,
+                 refresh, scriptJob, setFocus, setKeyframe, timeControl,
+                 undoInfo, waitCursor, warning, workspace):
+        setattr(module, func.__name__, _counted(func))
+    return module
+
+
+def about(**kwds):
+    return "2024"
+
+
+def channelBox(name, **kwds):
+    return list(SCENE.channel_attributes) or None
+
+
+def currentTime(*args, **kwds):
+    if kwds.get("q") or kwds.get("query"):
+        return SCENE.time
+    SCENE.time = float(args[0])
+    return SCENE.time
+
+
+def evalDeferred(*args, **kwds):
+    SCENE.deferred.append(args)
+
+
+def findKeyframe(curve, which, time=None):
+    times = SCENE.curves[curve].times
+    if time is None:
+        time = SCENE.time
+    else:
+        time = time[0]
+    if which == "previous":
+        return times[(bisect.bisect_left(times, time) - 1) % len(times)]
+    return times[bisect.bisect_right(times, time) % len(times)]
+
+
+def internalVar(**kwds):
+    return "/tmp/"
+
+
+def keyframe(*args, **kwds):
+    query = kwds.get("q") or kwds.get("query")
+    items = _as_list(args[0]) if args else []
+    if query and kwds.get("name"):
+        curves = []
+        for item in items:
+            if "." in item:
+                curve = SCENE.connections.get(item)
+                curves += [curve] if curve else []
+            else:
+                curves += [curve for plug, curve in SCENE.connections.items()
+                           if plug.split(".")[0] == item]
+        return _unique(curves) or None
+    if query and kwds.get("valueChange"):
+        result = []
+        for curve in items:
+            fake = SCENE.curves[curve]
+            result += [fake.values[fake.index(time)]
+                       for time in kwds["time"]]
+        return result
+    if kwds.get("e") or kwds.get("edit"):
+        for curve in items:
+            fake = SCENE.curves[curve]
+            for time in kwds["t"]:
+                fake.values[fake.index(time)] = kwds["valueChange"]
+        return None
+    # Tick drawing style and other edits aren't modelled
+    return None
+
+
+def keyTangent(*args, **kwds):
+    query = kwds.get("q") or kwds.get("query")
+    if query and kwds.get("g"):
+        return [SCENE.global_tangents[0 if kwds.get("itt") else 1]]
+    items = _as_list(args[0]) if args else []
+    if query:
+        fake = SCENE.curves[items[0]]
+        if "index" in kwds:
+            index = kwds["index"][0]
+        else:
+            index = fake.index(kwds["time"][0])
+        tangents = fake.in_tangents if kwds.get("itt") else fake.out_tangents
+        return [tangents[index]]
+    for curve in items:
+        fake = SCENE.curves[curve]
+        index = fake.index(kwds["t"][0])
+        if "itt" in kwds:
+            fake.in_tangents[index] = kwds["itt"]
+        if "ott" in kwds:
+            fake.out_tangents[index] = kwds["ott"]
+    return None
+
+
+def ls(*args, **kwds):
+    if kwds.get("sl") or kwds.get("selection"):
+        return list(SCENE.selection)
+    items = _as_list(args[0]) if args else []
+    if kwds.get("long") and items and all(item in SCENE.uuids.values()
+                                          for item in items):
+        return [node for node, uuid in SCENE.uuids.items() if uuid in items]
+    return _unique(item for item in items if objExists(item))
+
+
+def objExists(name):
+    if "." in name:
+        return name in SCENE.plugs
+    return name in SCENE.nodes or name in SCENE.curves
+
+
+def optionVar(*args, **kwds):
+    if "exists" in kwds:
+        return kwds["exists"] in SCENE.option_vars
+    if "q" in kwds:
+        return SCENE.option_vars[kwds["q"]]
+    if "stringValue" in kwds:
+        name, value = kwds["stringValue"]
+        SCENE.option_vars[name] = value
+    return None
+
+
+def refresh(*args, **kwds):
+    return None
+
+
+def scriptJob(*args, **kwds):
+    SCENE.jobs.append(kwds)
+    return len(SCENE.jobs)
+
+
+def setFocus(*args, **kwds):
+    return None
+
+
+def setKeyframe(curve, t, v, ott=None, **kwds):
+    SCENE.curves[curve].set_key(t[0], v, SCENE.global_tangents[0], ott)
+
+
+def timeControl(*args, **kwds):
+    return list(SCENE.time_range or (SCENE.time, SCENE.time + 1.0))
+
+
+def undoInfo(*args, **kwds):
+    return None
+
+
+def waitCursor(*args, **kwds):
+    return None
+
+
+def warning(*args, **kwds):
+    return None
+
+
+def workspace(*args, **kwds):
+    return SCENE.workspace
+
+
+# ----- maya.mel / maya.utils ---------------------------------------------#
+
+def _make_mel():
+    module = types.ModuleType("maya.mel")
+    module.eval = lambda command: "MayaWindow"
+    return module
+
+
+def _make_utils():
+    module = types.ModuleType("maya.utils")
+    module.executeDeferred = lambda func, *args: func(*args)
+    return module
+
+
+# ----- maya.api ----------------------------------------------------------#
+
+def _make_open_maya():
+    module = types.ModuleType("maya.api.OpenMaya")
+    for cls in (MTime, MAngle, MDistance, MSelectionList, MFnDependencyNode,
+                MUuid):
+        setattr(module, cls.__name__, cls)
+    callbacks = _Callbacks()
+    for name in ("MDGMessage", "MDagMessage", "MSceneMessage", "MMessage"):
+        setattr(module, name, callbacks)
+    module.MFn = types.SimpleNamespace(kTypedAttribute=1)
+    return module
+
+
+def _make_open_maya_anim():
+    module = types.ModuleType("maya.api.OpenMayaAnim")
+    module.MFnAnimCurve = MFnAnimCurve
+    return module
+
+
+# -------------------------------------------------------------------------
+# ----------------------------------------------------------- Classes -----
+
+class FakeCurve(object):
+    """
+    An anim curve: sorted key times with their values and tangent names
+    """
+
+    def __init__(self, name, times, values, in_tangents=None,
+                 out_tangents=None, unitless=False):
+        self.name = name
+        self.times = [float(time) for time in times]
+        self.values = [float(value) for value in values]
+        self.in_tangents = list(in_tangents or ["auto"] * len(times))
+        self.out_tangents = list(out_tangents or ["auto"] * len(times))
+        self.unitless = unitless
+
+    def index(self, time):
+        return self.times.index(float(time))
+
+    def set_key(self, time, value, in_tangent, out_tangent):
+        time = float(time)
+        if time in self.times:
+            index = self.times.index(time)
+            self.values[index] = value
+            if out_tangent is not None:
+                self.out_tangents[index] = out_tangent
+            return
+        index = bisect.bisect(self.times, time)
+        self.times.insert(index, time)
+        self.values.insert(index, value)
+        self.in_tangents.insert(index, in_tangent)
+        self.out_tangents.insert(index, out_tangent or in_tangent)
+
+    def keys(self):
+        return list(zip(self.times, self.values, self.in_tangents,
+                        self.out_tangents))
+
+
+class FakeScene(object):
+    """
+    Everything the stand-in commands read and write
+    """
+
+    def __init__(self):
+        self.curves = collections.OrderedDict()
+        self.nodes = set()
+        # Every attribute that exists, keyed or not
+        self.plugs = set()
+        # plug -> name of the anim curve driving it
+        self.connections = collections.OrderedDict()
+        self.uuids = {}
+        self.selection = []
+        self.channel_attributes = []
+        self.time = 0.0
+        # The highlighted range, or None for just the current frame
+        self.time_range = None
+        # Project root directory
+        self.workspace = ""
+        self.global_tangents = ("auto", "auto")
+        self.option_vars = {}
+        self.jobs = []
+        self.deferred = []
+        self.calls = collections.Counter()
+
+    def add_node(self, node, attributes=()):
+        self.nodes.add(node)
+        self.uuids.setdefault(node, "UUID-%s" % node)
+        for attribute in attributes:
+            self.plugs.add("%s.%s" % (node, attribute))
+
+    def add_curve(self, node, attribute, times, values, in_tangents=None,
+                  out_tangents=None, unitless=False):
+        """
+        Add an anim curve driving node.attribute and return its name
+        """
+        self.add_node(node, [attribute])
+        name = "%s_%s" % (node, attribute)
+        self.curves[name] = FakeCurve(name, times, values, in_tangents,
+                                      out_tangents, unitless)
+        self.connections["%s.%s" % (node, attribute)] = name
+        return name
+
+    def snapshot(self):
+        """
+        Return the keys of every curve, for comparing scenes
+        """
+        return dict((name, curve.keys())
+                    for name, curve in self.curves.items())
+
+
+class _Callbacks(object):
+    """
+    MMessage classes: callbacks are accepted and never called
+    """
+
+    def __getattr__(self, name):
+        if name.startswith("k"):
+            return name
+        return lambda *args, **kwds: 0
+
+
+class MTime(object):
+    """
+    Times are always in frames
+    """
+
+    def __init__(self, value=0.0, unit=None):
+        self.value = float(value)
+
+    @staticmethod
+    def uiUnit():
+        return "frames"
+
+    def asUnits(self, unit):
+        return self.value
+
+    def __lt__(self, other):
+        return self.value < other.value
+
+    def __gt__(self, other):
+        return self.value > other.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class MAngle(object):
+    """
+    Values are stored in UI units, so no conversion is needed
+    """
+
+    def __init__(self, value):
+        self.value = value
+
+    @staticmethod
+    def uiUnit():
+        return "ui"
+
+    def asUnits(self, unit):
+        return self.value
+
+
+class MDistance(MAngle):
+    pass
+
+
+class MUuid(object):
+
+    def __init__(self, text):
+        self.text = text
+
+    def asString(self):
+        return self.text
+
+
+class MSelectionList(object):
+    """
+    Holds curve and node names.  Like Maya, an item is only added once.
+    """
+
+    def __init__(self):
+        self.items = []
+
+    def add(self, name):
+        if not objExists(name):
+            raise RuntimeError("(kInvalidParameter): Object does not exist")
+        if name not in self.items:
+            self.items.append(name)
+
+    def clear(self):
+        self.items = []
+
+    def length(self):
+        return len(self.items)
+
+    def getDependNode(self, index):
+        return self.items[index]
+
+
+class MFnDependencyNode(object):
+
+    def __init__(self, node):
+        self.node = node
+
+    def uuid(self):
+        return MUuid(SCENE.uuids.get(self.node, ""))
+
+
+class MFnAnimCurve(object):
+    """
+    Reads a FakeCurve.  Every curve has time input and UI-unit values.
+    """
+    kAnimCurveTA = "TA"
+    kAnimCurveTL = "TL"
+    kAnimCurveTU = "TU"
+    kAnimCurveUA = "UA"
+    kAnimCurveUL = "UL"
+    kAnimCurveUU = "UU"
+
+    def __init__(self, curve):
+        self.curve = SCENE.curves[curve]
+
+    @property
+    def numKeys(self):
+        return len(self.curve.times)
+
+    @property
+    def animCurveType(self):
+        return self.kAnimCurveUU if self.curve.unitless else self.kAnimCurveTU
+
+    @property
+    def isUnitlessInput(self):
+        return self.curve.unitless
+
+    def findClosest(self, time):
+        if self.curve.unitless:
+            raise RuntimeError("(kInvalidParameter): Curve isn't time based")
+        times = self.curve.times
+        index = bisect.bisect_left(times, time.value)
+        if index == len(times):
+            return index - 1
+        if index and time.value - times[index - 1] <= times[index] - time.value:
+            return index - 1
+        return index
+
+    def input(self, index):
+        if self.curve.unitless:
+            raise RuntimeError("(kInvalidParameter): Curve isn't time based")
+        return MTime(self.curve.times[index])
+
+    def value(self, index):
+        return self.curve.values[index]
+
+    def inTangentType(self, index):
+        return TANGENT_TYPES.index(self.curve.in_tangents[index])
+
+    def outTangentType(self, index):
+        return TANGENT_TYPES.index(self.curve.out_tangents[index])
+
+
+for _name, _attr in API_TANGENT_NAMES.items():
+    setattr(MFnAnimCurve, _attr, TANGENT_TYPES.index(_name))
@@ -0,0 +1,175 @@
+"""
+Tests for checking and copying file textures, with the Maya commands
+replaced by the stand-in and real files in a temporary directory
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import fake_maya
+
+ftm = fake_maya.load_module("file_texture_manager")
+
+
+class TextureTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.scene = fake_maya.new_scene()
+        self.scene.workspace = os.path.join(self.root, "project")
+        self.sourceimages = os.path.join(self.scene.workspace, "sourceimages")
+        os.makedirs(self.sourceimages)
+
+    def make_file(self, path, content, mtime=None):
+        path = os.path.join(self.root, path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as texture:
+            texture.write(content)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def make_node(self, path, name="file1"):
+        node = ftm.FileNode(name, {"fileTextureName": path})
+        node.validate_path_location()
+        return node
+
+    def copied(self, name):
+        with open(os.path.join(self.sourceimages, name), "rb") as texture:
+            return texture.read()
+
+
+class CollisionTest(TextureTestCase):
+
+    def test_same_name_in_one_run(self):
+        first = self.make_node(self.make_file("a/x.png", b"a" * 100))
+        second = self.make_node(self.make_file("b/x.png", b"b" * 100),
+                                "file2")
+        results = ftm.copy_textures([first, second])
+        self.assertIsNone(results[first])
+        self.assertIsInstance(results[second], ftm.CopyCollision)
+        self.assertIsNone(second.new_file_path)
+        self.assertEqual(self.copied("x.png"), b"a" * 100)
+
+    def test_same_name_from_an_earlier_run(self):
+        first = self.make_node(self.make_file("a/x.png", b"a" * 100, 1000))
+        ftm.copy_textures([first])
+        # Far enough apart that the times alone don't match
+        second = self.make_node(self.make_file("b/x.png", b"b" * 100, 5000))
+        with self.assertLogs(ftm.logger, "WARNING") as logs:
+            results = ftm.copy_textures([second])
+        self.assertIsInstance(results[second], ftm.CopyCollision)
+        self.assertFalse(second.needs_move)
+        self.assertIn(second.old_path, logs.output[0])
+        self.assertEqual(self.copied("x.png"), b"a" * 100)
+
+    def test_overwrite(self):
+        self.make_file("project/sourceimages/x.png", b"older")
+        node = self.make_node(self.make_file("b/x.png", b"new"))
+        results = ftm.copy_textures([node], overwrite=True)
+        self.assertIsNone(results[node])
+        self.assertEqual(self.copied("x.png"), b"new")
+
+
+class CopyTexturesTest(TextureTestCase):
+
+    def test_cancel_from_on_progress(self):
+        nodes = [self.make_node(self.make_file("a/%d.png" % index,
+                                               b"x" * 400000),
+                                "file%d" % index)
+                 for index in range(3)]
+        calls = []
+
+        def on_progress(progress):
+            calls.append(progress.copied_bytes)
+            return True
+
+        # Small chunks, so the first copy is still running when it's
+        # cancelled, and the others are waiting for the single worker
+        with mock.patch.object(ftm, "COPY_CHUNK_SIZE", 16):
+            results = ftm.copy_textures(nodes, max_workers=1,
+                                        on_progress=on_progress,
+                                        interval=0.001)
+        self.assertTrue(calls)
+        for node in nodes:
+            self.assertIsInstance(results[node], ftm.CopyCancelled)
+            self.assertIsInstance(node.copy_error, ftm.CopyCancelled)
+            self.assertIsNone(node.new_file_path)
+        self.assertEqual(os.listdir(self.sourceimages), [])
+
+    def test_rerun_skips_copied_files(self):
+        nodes = [self.make_node(self.make_file("a/%d.png" % index,
+                                               b"x" * 1000),
+                                "file%d" % index)
+                 for index in range(3)]
+        first = ftm.CopyProgress()
+        ftm.copy_textures(nodes, progress=first)
+        self.assertEqual(first.copied_bytes, 3000)
+        nodes = [self.make_node(node.old_path, node.node) for node in nodes]
+        second = ftm.CopyProgress()
+        results = ftm.copy_textures(nodes, progress=second)
+        self.assertEqual(list(results.values()), [None] * 3)
+        self.assertEqual(second.copied_bytes, 0)
+        self.assertEqual(second.skipped_bytes, 3000)
+
+    def test_shared_source_is_copied_once(self):
+        path = self.make_file("a/x.png", b"x" * 1000)
+        nodes = [self.make_node(path, "file1"), self.make_node(path, "file2")]
+        progress = ftm.CopyProgress()
+        results = ftm.copy_textures(nodes, progress=progress)
+        self.assertEqual(results, {nodes[0]: None, nodes[1]: None})
+        self.assertEqual(progress.total_files, 1)
+        self.assertEqual(progress.copied_bytes, 1000)
+        for node in nodes:
+            self.assertEqual(node.new_file_path, "sourceimages/x.png")
+
+
+class ValidatePathsExistTest(TextureTestCase):
+
+    def check(self, names, existing, scandir):
+        for name in existing:
+            self.make_file(os.path.join("textures", name), b"x")
+        # A directory with the same name as a texture isn't a file
+        os.makedirs(os.path.join(self.root, "textures", "folder.png"))
+        nodes = [ftm.FileNode("file%d" % index, {
+            "fileTextureName": os.path.join(self.root, "textures", name)})
+            for index, name in enumerate(names)]
+        with mock.patch.object(ftm.os, "scandir",
+                               wraps=os.scandir) as scan:
+            ftm.validate_paths_exist(nodes)
+        self.assertEqual(scan.called, scandir)
+        return dict((os.path.basename(node.old_path), node.file_exists)
+                    for node in nodes)
+
+    def test_listing_the_directory(self):
+        names = ["a.png", "b.png", "c.png", "missing.png", "folder.png"]
+        self.assertGreaterEqual(len(names), ftm.SCANDIR_MIN_FILES)
+        self.assertEqual(self.check(names, names[:3], scandir=True),
+                         {"a.png": True, "b.png": True, "c.png": True,
+                          "missing.png": False, "folder.png": False})
+
+    def test_checking_each_file(self):
+        names = ["a.png", "missing.png", "folder.png"]
+        self.assertLess(len(names), ftm.SCANDIR_MIN_FILES)
+        self.assertEqual(self.check(names, names[:1], scandir=False),
+                         {"a.png": True, "missing.png": False,
+                          "folder.png": False})
+
+    def test_missing_directory(self):
+        nodes = [ftm.FileNode("file%d" % index, {
+            "fileTextureName": os.path.join(self.root, "gone",
+                                            "%d.png" % index)})
+            for index in range(ftm.SCANDIR_MIN_FILES)]
+        nodes.append(ftm.FileNode("empty", {"fileTextureName": ""}))
+        ftm.validate_paths_exist(nodes)
+        self.assertEqual([node.file_exists for node in nodes],
+                         [False] * len(nodes))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+"""
+Tests for the tween math, and for running tween() and the benchmark against
+the stand-in maya.cmds
+"""
+
+import random
+import unittest
+
+import benchmark_tween
+import fake_maya
+
+tweenMac = fake_maya.load_tween_machine()
+tween_core = tweenMac.tween_core
+
+
+def global_tangents():
+    return ("linear", "clamped")
+
+
+def random_arrays(num_curves, seed=0):
+    """
+    Return random tween_arrays arguments, with plenty of fixed and step
+    tangents
+    """
+    rand = random.Random(seed)
+    codes = [tween_core.TANGENT_CODES[name] for name in
+             ("spline", "linear", "flat", "step", "fixed", "auto")]
+    return ([rand.uniform(-10, 10) for _ in range(num_curves)],
+            [rand.uniform(-10, 10) for _ in range(num_curves)],
+            [rand.choice(codes) for _ in range(num_curves)],
+            [rand.choice(codes) for _ in range(num_curves)],
+            [rand.choice(codes) for _ in range(num_curves)],
+            [rand.choice(codes) for _ in range(num_curves)])
+
+
+class TweenArraysTest(unittest.TestCase):
+
+    def test_python_rules(self):
+        spline, step, fixed = [tween_core.TANGENT_CODES[name] for name in
+                               ("spline", "step", "fixed")]
+        values, in_codes, out_codes = tween_core._tween_arrays_python(
+            [0.0, 0.0, 0.0], [10.0, 10.0, 10.0], [spline, spline, fixed],
+            [spline, spline, spline], [spline, spline, spline],
+            [spline, step, spline], 0.25, global_tangents)
+        self.assertEqual(values, [2.5, 2.5, 2.5])
+        self.assertEqual([tween_core.TANGENT_NAMES[code]
+                          for code in in_codes],
+                         ["spline", "spline", "linear"])
+        self.assertEqual([tween_core.TANGENT_NAMES[code]
+                          for code in out_codes],
+                         ["spline", "step", "clamped"])
+
+    @unittest.skipIf(tween_core.get_numpy() is None, "NumPy isn't installed")
+    def test_numpy_matches_python(self):
+        arrays = random_arrays(500)
+        rand = random.Random(1)
+        for bias in (0.33, [rand.uniform(-0.5, 1.5) for _ in range(500)]):
+            python = tween_core._tween_arrays_python(
+                *(arrays + (bias, global_tangents)))
+            numpy = tween_core._tween_arrays_numpy(
+                *(arrays + (bias, global_tangents)))
+            for expected, result in zip(python[0], numpy[0]):
+                self.assertAlmostEqual(expected, result)
+            self.assertEqual(python[1:], numpy[1:])
+
+    def test_curve_data_at_wraps(self):
+        keys = benchmark_tween.make_test_keys(3, 5)
+        data = tween_core.curve_data_at(keys, 100.0)
+        self.assertEqual(data.time_prev, [16.0] * 3)
+        self.assertEqual(data.time_next, [0.0] * 3)
+
+
+class TweenTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scene = fake_maya.new_scene()
+        self.scene.time = 5.0
+
+    def test_tween_writes_keys(self):
+        curve = self.scene.add_curve("ctrl", "tx", [0, 10], [0, 20],
+                                     ["linear", "linear"],
+                                     ["linear", "step"])
+        tweenMac.tween(0.25, ["ctrl"])
+        self.assertEqual(self.scene.curves[curve].keys()[1],
+                         (5.0, 5.0, "linear", "step"))
+
+    def test_matches_per_curve_tween(self):
+        nodes = benchmark_tween.make_scene(40, 6, seed=3)
+        fake_maya.SCENE.global_tangents = ("linear", "clamped")
+        benchmark_tween.tween_per_curve(0.7, nodes)
+        expected = fake_maya.SCENE.snapshot()
+        benchmark_tween.make_scene(40, 6, seed=3)
+        fake_maya.SCENE.global_tangents = ("linear", "clamped")
+        tweenMac.tween(0.7, nodes)
+        result = fake_maya.SCENE.snapshot()
+        self.assertEqual(sorted(result), sorted(expected))
+        for curve, keys in expected.items():
+            for expected_key, key in zip(keys, result[curve]):
+                self.assertEqual(key[0], expected_key[0])
+                self.assertAlmostEqual(key[1], expected_key[1])
+                self.assertEqual(key[2:], expected_key[2:])
+
+    def test_unknown_tangent_type(self):
+        # A tangent type with no MFnAnimCurve constant in this table
+        curve = self.scene.add_curve("ctrl", "tx", [0, 10], [0, 20],
+                                     ["futuretangent", "linear"],
+                                     ["futuretangent", "futuretangent"])
+        data = tweenMac.get_curve_data([curve], 5.0)
+        self.assertEqual(tween_core.TANGENT_NAMES[data.out_tan_prev[0]],
+                         "futuretangent")
+        tweenMac.tween(0.5, ["ctrl"])
+        self.assertEqual(self.scene.curves[curve].keys()[1],
+                         (5.0, 10.0, "futuretangent", "linear"))
+
+    def test_newer_auto_tangents(self):
+        curve = self.scene.add_curve("ctrl", "tx", [0, 10], [0, 20],
+                                     ["automix", "autoease"],
+                                     ["autocustom", "autoease"])
+        self.scene.calls.clear()
+        tweenMac.tween(0.5, ["ctrl"])
+        self.assertEqual(self.scene.curves[curve].keys()[1],
+                         (5.0, 10.0, "autocustom", "autoease"))
+        # Found through the API table, without asking keyTangent
+        self.assertEqual(self.scene.calls["keyTangent"], 1)
+
+    def test_unitless_curves_skipped(self):
+        timed = self.scene.add_curve("ctrl", "tx", [0, 10], [0, 20])
+        driven = self.scene.add_curve("ctrl", "ty", [0, 10], [0, 20],
+                                      unitless=True)
+        self.assertEqual(tweenMac.get_curve_data([timed, driven], 5.0).curves,
+                         [timed])
+        self.assertEqual(tweenMac.get_curve_keys([timed, driven]).curves,
+                         [timed])
+        tweenMac.tween(0.5, ["ctrl"])
+        self.assertEqual(len(self.scene.curves[timed].keys()), 3)
+        self.assertEqual(len(self.scene.curves[driven].keys()), 2)
+
+    def test_tween_range_keeps_existing_keys(self):
+        curve = self.scene.add_curve("ctrl", "tx", [0, 5, 10], [0, 7, 20],
+                                     ["linear"] * 3, ["linear"] * 3)
+        self.scene.time_range = (0.0, 10.0)
+        tweenMac.tween_range(0.5, ["ctrl"], step=2.5)
+        self.assertEqual([key[:2] for key in
+                          self.scene.curves[curve].keys()],
+                         [(0.0, 0.0), (2.5, 3.5), (5.0, 7.0), (7.5, 13.5),
+                          (10.0, 20.0)])
+
+    def test_tween_range_frames_and_biases(self):
+        curve = self.scene.add_curve("ctrl", "tx", [0, 10], [0, 20])
+        tweenMac.tween_range([0.25, 0.75], ["ctrl"], frames=[2, 4])
+        # Both keys come from the keys that were there before the call
+        self.assertEqual([key[:2] for key in
+                          self.scene.curves[curve].keys()],
+                         [(0.0, 0.0), (2.0, 5.0), (4.0, 15.0), (10.0, 20.0)])
+        with self.assertRaises(ValueError):
+            tweenMac.tween_range([0.5], ["ctrl"], frames=[2, 4])
+
+    def test_tween_range_bad_step(self):
+        self.scene.add_curve("ctrl", "tx", [0, 10], [0, 20])
+        for step in (0, -1):
+            with self.assertRaises(ValueError):
+                tweenMac.tween_range(0.5, ["ctrl"], step=step)
+
+    def test_live_drag(self):
+        curve = self.scene.add_curve("ctrl", "tx", [0, 10], [0, 20])
+        drag = tweenMac.TMDragTween(["ctrl"])
+        drag.update(0.25)
+        drag.update(0.5)
+        drag.finish(0.75)
+        self.assertEqual([key[:2] for key in
+                          self.scene.curves[curve].keys()],
+                         [(0.0, 0.0), (5.0, 15.0), (10.0, 20.0)])
+        self.assertEqual(self.scene.calls["undoInfo"], 2)
+
+    def test_core_benchmark_runs(self):
+        results = benchmark_tween.benchmark_core(50, 10, repeat=1)
+        self.assertEqual(sorted(results),
+                         ["neighbours", "tangents", "tween", "values"])
+
+    def test_benchmark_runs(self):
+        results = benchmark_tween.benchmark(50, 10, repeat=1)
+        for phase in ("discovery", "gather", "compute", "write", "total"):
+            self.assertGreater(results[phase], 0)
+        # Curves are found, gathered and written in bulk
+        self.assertLess(results["commands_per_curve"], 2)
+
+    def test_compare_runs(self):
+        results = benchmark_tween.compare(20, 6, repeat=1)
+        self.assertLess(results["after"][1], results["before"][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Tests for finding the anim curves to tween, against the stand-in maya.cmds
+"""
+
+import unittest
+
+import fake_maya
+
+tweenMac = fake_maya.load_tween_machine()
+
+
+def per_plug_curves(nodes, attributes):
+    """
+    The curve lookup tween() used before, with one objExists and one keyframe
+    query per node and attribute
+    """
+    mc = tweenMac.mc
+    curves = []
+    for attr in attributes:
+        for node in nodes:
+            fullnode = "%s.%s" % (node, attr)
+            if not mc.objExists(fullnode):
+                continue
+            tmp = mc.keyframe(fullnode, q=True, name=True)
+            if not tmp:
+                continue
+            curves += tmp
+    return curves
+
+
+class GetTweenCurvesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scene = fake_maya.new_scene()
+        for node in ("ctrl1", "ctrl2", "ctrl3"):
+            for attr in ("tx", "ry"):
+                self.scene.add_curve(node, attr, [0, 10], [0, 1])
+            # Keyable but not animated
+            self.scene.add_node(node, ["sz"])
+        self.scene.add_curve("ctrl2", "custom", [0, 10], [0, 1])
+
+    def check_matches_per_plug(self, nodes, attributes):
+        self.scene.channel_attributes = attributes
+        expected = per_plug_curves(nodes, attributes)
+        self.scene.calls.clear()
+        curves = tweenMac.get_tween_curves(nodes)
+        # The old loop listed a curve once for every time its plug was given
+        self.assertEqual(curves, list(dict.fromkeys(expected)))
+        return curves
+
+    def test_channel_box_attributes(self):
+        curves = self.check_matches_per_plug(["ctrl1", "ctrl2", "ctrl3"],
+                                             ["ry", "tx"])
+        self.assertEqual(len(curves), 6)
+        self.assertEqual(self.scene.calls["ls"], 1)
+        self.assertEqual(self.scene.calls["keyframe"], 1)
+        self.assertEqual(self.scene.calls["objExists"], 0)
+
+    def test_missing_and_unkeyed_plugs(self):
+        # custom only exists on ctrl2, sz isn't keyed, and bogus doesn't exist
+        curves = self.check_matches_per_plug(["ctrl1", "ctrl2", "ctrl3"],
+                                             ["custom", "sz", "bogus", "tx"])
+        self.assertEqual(curves, ["ctrl2_custom", "ctrl1_tx", "ctrl2_tx",
+                                  "ctrl3_tx"])
+
+    def test_duplicate_curves(self):
+        self.check_matches_per_plug(["ctrl1", "ctrl1", "ctrl2"], ["tx", "tx"])
+
+    def test_no_matching_plugs(self):
+        self.scene.channel_attributes = ["bogus"]
+        self.assertEqual(per_plug_curves(["ctrl1"], ["bogus"]), [])
+        self.assertEqual(tweenMac.get_tween_curves(["ctrl1"]), [])
+
+    def test_whole_nodes(self):
+        self.scene.selection = ["ctrl2"]
+        self.assertEqual(tweenMac.get_tween_curves(),
+                         ["ctrl2_tx", "ctrl2_ry", "ctrl2_custom"])
+
+    def test_nothing_selected(self):
+        self.assertIsNone(tweenMac.get_tween_curves())
+
+
+class CacheLifetimeTest(unittest.TestCase):
+
+    def setUp(self):
+        fake_maya.new_scene()
+        self.addCleanup(tweenMac.CURVE_CACHE.uninstall, force=True)
+        self.addCleanup(tweenMac.UUID_CACHE.uninstall, force=True)
+
+    def test_reopened_window_keeps_caches(self):
+        # start() while the tool is open makes the new window before the old
+        # one's uiDeleted job runs
+        for cache in (tweenMac.CURVE_CACHE, tweenMac.UUID_CACHE):
+            cache.install()
+            cache.install()
+            cache.uninstall()
+        self.assertTrue(tweenMac.UUID_CACHE.installed)
+        tweenMac.CURVE_CACHE.set(["ctrl1"], [], ["ctrl1_tx"])
+        self.assertEqual(tweenMac.CURVE_CACHE.get(["ctrl1"], []),
+                         ("ctrl1_tx",))
+
+    def test_last_window_removes_callbacks(self):
+        for cache in (tweenMac.CURVE_CACHE, tweenMac.UUID_CACHE):
+            cache.install()
+            cache.uninstall()
+            cache.uninstall()
+        self.assertFalse(tweenMac.UUID_CACHE.installed)
+        tweenMac.CURVE_CACHE.set(["ctrl1"], [], ["ctrl1_tx"])
+        self.assertIsNone(tweenMac.CURVE_CACHE.get(["ctrl1"], []))
+
+
+if __name__ == "__main__":
+    unittest.main()
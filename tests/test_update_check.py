@@ -0,0 +1,104 @@
+"""
+Tests for the update check, against an HTTP server on localhost
+"""
+
+import http.server
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+import fake_maya
+
+tweenMac = fake_maya.load_tween_machine()
+
+
+class VersionHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.server.requests += 1
+        if self.path.startswith("/broken"):
+            # Not an HTTP response at all
+            self.wfile.write(b"nonsense\r\n\r\n")
+            return
+        body = self.server.version.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class UpdateCheckTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = http.server.HTTPServer(("127.0.0.1", 0), VersionHandler)
+        self.server.version = "9.9.9\n"
+        self.server.requests = 0
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = "http://127.0.0.1:%d/version" % self.server.server_port
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.cache_path = os.path.join(directory, "update.json")
+        self.reported = []
+
+    def check(self, url=None, timeout=2):
+        thread = tweenMac.check_for_update(
+            url=url or self.url, timeout=timeout, cache_path=self.cache_path,
+            report=self.reported.append, defer=lambda func, *a: func(*a))
+        if thread is not None:
+            thread.join(10)
+            self.assertFalse(thread.is_alive())
+        return thread
+
+    def test_fetch_and_cache(self):
+        self.assertIsNotNone(self.check())
+        self.assertEqual(self.reported, ["9.9.9"])
+        self.assertEqual(tweenMac.read_update_cache(self.cache_path,
+                                                    self.url),
+                         (True, "9.9.9"))
+
+    def test_cache_hit_within_ttl(self):
+        self.check()
+        self.server.version = "10.0.0"
+        self.assertIsNone(self.check())
+        self.assertEqual(self.reported, ["9.9.9", "9.9.9"])
+        self.assertEqual(self.server.requests, 1)
+
+    def test_other_url_isnt_cached(self):
+        self.check()
+        self.check(self.url + "?again")
+        self.assertEqual(self.server.requests, 2)
+
+    def test_timeout(self):
+        # Connections are queued by the listening socket but never answered
+        silent = socket.socket()
+        self.addCleanup(silent.close)
+        silent.bind(("127.0.0.1", 0))
+        silent.listen(1)
+        url = "http://127.0.0.1:%d/version" % silent.getsockname()[1]
+        self.check(url, timeout=0.2)
+        self.assertEqual(self.reported, [None])
+        # The failure is cached so the next start doesn't wait again
+        self.assertEqual(tweenMac.read_update_cache(self.cache_path, url),
+                         (True, None))
+
+    def test_bad_response(self):
+        url = self.url.replace("/version", "/broken")
+        self.assertIsNone(tweenMac.fetch_latest_version(url, 2))
+        self.check(url)
+        self.assertEqual(self.reported, [None])
+        self.assertEqual(tweenMac.read_update_cache(self.cache_path, url),
+                         (True, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
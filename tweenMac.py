@@ -10,6 +10,12 @@ description:    Tool for creating breakdown or "tween" keyframes between the
 usage:          import tweenMachine
                 tweenMachine.start()
 
+                Hotkeys only need the tween functions.  Importing the module
+                doesn't query Maya or read the settings, and the UI, XML and
+                network pieces are loaded the first time they're used:
+                import tools.tweenMac as tweenMac
+                tweenMac.tween(0.33)
+
 revisions:
     - 2013.04.12 - 3.0.0 - jbarrett
         - Initial publish after conversion to Python
@@ -26,6 +32,53 @@ revisions:
         - Added Help menu
     - 2022.05.03 - 3.0.0c
         - converted to python 3 using online tool - looks like it runs
+    - 2026.10.18 - 3.0.0d
+        - Changed: tween() gathers key data for all curves in one API pass and
+          batches the tangent and tick edits
+        - Added: Live Drag option (off by default) that tweens while the
+          slider is dragged, using key data cached at the start of the drag
+        - Added: tween_range() for making breakdowns on many frames at once
+        - Changed: Curves found for a selection are cached until the
+          selection, scene or anim curves change
+        - Changed: Curves for selected channel box attributes are found with one
+          query instead of one per node and attribute
+        - Changed: Moved the tween math into the Maya-free tween_core module
+        - Changed: Values and tangent types are computed as arrays, using NumPy
+          when it's available
+        - Added: Fast Write option that suspends viewport refresh while keys
+          are written.  Each tween is now a single undo chunk.
+        - Added: tween_sets() and TMGroup.tween() for tweening many sets, each
+          with its own bias, in one pass
+        - Fixed: Groups and sets read from the scene data were built with the
+          wrong arguments, and sets didn't expose their nodes
+        - Added: PROFILER, which records phase timings and maya.cmds call
+          counts for each tween when enabled
+        - Changed: Data changes are written to the data node once per batch or
+          once when Maya is idle, instead of after every change
+        - Fixed: Set changes were never saved, and remove_set() failed
+        - Changed: Scene data is stored as versioned JSON with compressed node
+          lists that are only decoded when a set is used.  XML data is
+          converted automatically.
+        - Fixed: Existing tweenMachineData was ignored and overwritten
+        - Changed: Old MEL data is converted with a few bulk queries.  Added
+          convert_scene_files() for converting scenes from mayapy.
+        - Added: TMData.sets_containing() for finding the sets that contain a
+          node, using an index that's kept up to date as sets change
+        - Changed: Sets store node UUIDs as well as names, so they still find
+          their nodes after renames, namespace changes and reference reloads
+        - Changed: Settings are saved as JSON, once per batch or when Maya is
+          idle, and read without eval().  Defaults come from
+          TMSettings.DEFAULTS.
+        - Fixed: A stray special_tick setting was saved on every start
+        - Changed: The update check runs on a background thread with a
+          timeout, and its result is cached for a day
+        - Changed: Importing the module no longer queries Maya or reads the
+          settings, and the XML, network and NumPy modules are imported when
+          they're first used.  Added startup_benchmark() to time the import.
+        - Changed: Refreshing a button row only edits the buttons that
+          changed, instead of deleting and rebuilding the whole row
+        - Added: Groups are shown in the window as collapsible frames.  A
+          group's set rows are only built when it's first expanded.
 to-do:
 
 """
@@ -34,21 +87,42 @@ to-do:
 # ----------------------------------------------------------- Imports -----
 
 # Built-in
+import ast
+import base64
+import collections
+import contextlib
+import functools
+import glob
+import json
+import logging
 import os
-import urllib.request, urllib.error, urllib.parse
-import xml.etree.cElementTree as etree
+import sys
+import time as _time
+import zlib
 
 # Third-party
 import maya.cmds as mc
 import maya.mel as mel
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
 
 # Custom
+import tools.tween_core as tween_core
 
 # -------------------------------------------------------------------------
 # ----------------------------------------------------------- Globals -----
 
 __version__ = "3.0.0 b1c"
-MAYA_VERSION = mc.about(version=True)
+# Version of the data stored on the tweenMachineData node
+DATA_VERSION = 2
+# MAYA_VERSION is looked up the first time it's used; see maya_version()
+# Where the latest version is published, and how the update check uses it
+UPDATE_URL = "http://www.justinsbarrett.com/tmupdate.php?tmquery=version"
+UPDATE_TIMEOUT = 3
+UPDATE_CACHE_TTL = 24 * 60 * 60
+
+logger = logging.getLogger(__name__)
+_maya_version = None
 
 
 # -------------------------------------------------------------------------
@@ -86,6 +160,54 @@ def find_ui(uitype):
     return ""
 
 
+def maya_version():
+    """
+    Return the Maya version string, querying it the first time it's needed
+    """
+    global _maya_version
+    if _maya_version is None:
+        _maya_version = mc.about(version=True)
+    return _maya_version
+
+
+def __getattr__(name):
+    """
+    Resolve module attributes that are only computed when they're first used
+    """
+    if name == "MAYA_VERSION":
+        return maya_version()
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def startup_benchmark(repeat=5):
+    """
+    Time a fresh import of this module and tween_core.  Returns the best time
+    in milliseconds.  The modules that are already loaded are put back
+    afterwards, so the running tool isn't affected.
+    """
+    names = (__name__, tween_core.__name__)
+    loaded = dict((name, sys.modules[name]) for name in names
+                  if name in sys.modules)
+    best = None
+    try:
+        for _ in range(repeat):
+            for name in names:
+                sys.modules.pop(name, None)
+            start = _time.perf_counter()
+            __import__(__name__)
+            elapsed = _time.perf_counter() - start
+            if best is None or elapsed < best:
+                best = elapsed
+    finally:
+        sys.modules.update(loaded)
+        # Importing also rebinds the module on its parent package
+        for name, module in loaded.items():
+            parent, _, child = name.rpartition(".")
+            if parent in sys.modules:
+                setattr(sys.modules[parent], child, module)
+    return best * 1000.0
+
+
 def start():
     """
     Convenience function to open the main tweenMachine instance
@@ -100,102 +222,1115 @@ def inactive():
     mc.warning("This tweenMachine feature is not currently active.")
 
 
+def profile(func):
+    """
+    Decorator that records a profile of each call to a tween function while
+    the profiler is enabled
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwds):
+        with PROFILER.record(func.__name__):
+            return func(*args, **kwds)
+    return wrapper
+
+
+def profile_phase(phase):
+    """
+    Decorator that adds the time spent in a function to the named phase of
+    the current profile record
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwds):
+            if PROFILER._current is None:
+                return func(*args, **kwds)
+            start = _time.perf_counter()
+            try:
+                return func(*args, **kwds)
+            finally:
+                PROFILER.add_phase_time(phase, _time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+@profile
 def tween(bias, nodes=None):
     """
     Create the in-between key(s) on the specified nodes
     """
-    if isinstance(nodes, list) and not nodes:
-        nodes = None
     # Find the current frame, where the new key will be added
     currenttime = mc.timeControl("timeControl1", q=True, ra=True)[0]
+    curves = get_tween_curves(nodes)
+    if curves is None:
+        return
+    mc.waitCursor(state=True)
+    # Wrap the main operation in a try/except to prevent the waitcursor from
+    # sticking if something should fail
+    try:
+        # Gather the surrounding key data for every curve in one pass, then
+        # compute and write all of the new keys
+        curve_data = get_curve_data(curves, mc.currentTime(q=True))
+        values, in_tangents, out_tangents = compute_tween(curve_data, bias)
+        with write_block(SETTINGS["use_fast_write"]):
+            write_keys(curve_data.curves, currenttime, values, in_tangents,
+                       out_tangents)
+    except:
+        raise
+    finally:
+        mc.waitCursor(state=False)
+        restore_time_and_focus(currenttime)
+
+
+@profile
+def tween_range(bias, nodes=None, frames=None, step=1):
+    """
+    Create in-between keys on many frames in one pass.  By default a key is
+    made on every step-th frame of the highlighted time range; pass a list of
+    frames to key specific frames instead.  The bias may be a single value or
+    a sequence with one bias per frame.  The neighbouring keys are always the
+    ones that existed before the call, so new breakdowns don't affect each
+    other.  Frames that are already keyed on a curve are left alone.
+    """
+    if step <= 0:
+        raise ValueError("step must be positive, got %s" % step)
+    currenttime = mc.currentTime(q=True)
+    if frames is None:
+        start, end = mc.timeControl("timeControl1", q=True, ra=True)
+        frames = []
+        frame = start
+        while frame < end:
+            frames.append(frame)
+            frame += step
+    if isinstance(bias, (int, float)):
+        biases = [bias] * len(frames)
+    else:
+        biases = list(bias)
+        if len(biases) != len(frames):
+            raise ValueError("Expected %d bias values, got %d"
+                             % (len(frames), len(biases)))
+    curves = get_tween_curves(nodes)
+    if curves is None:
+        return
+    mc.waitCursor(state=True)
+    try:
+        # Read every key once, then resolve each frame from the cached data
+        keys = get_curve_keys(curves)
+        with write_block(SETTINGS["use_fast_write"]):
+            for frame, frame_bias in zip(frames, biases):
+                curve_data = tween_core.curve_data_at(keys, frame,
+                                                      skip_keyed=True)
+                values, in_tangents, out_tangents = compute_tween(
+                    curve_data, frame_bias)
+                write_keys(curve_data.curves, frame, values, in_tangents,
+                           out_tangents)
+    finally:
+        mc.waitCursor(state=False)
+        restore_time_and_focus(currenttime)
+
+
+@profile
+def tween_sets(set_biases):
+    """
+    Tween several sets of nodes in one pass, each with its own bias.
+    set_biases is a list of (nodes, bias) pairs.  Curves that are shared
+    between sets are only keyed once, using the bias of the first set that
+    contains them.
+    """
+    currenttime = mc.timeControl("timeControl1", q=True, ra=True)[0]
+    curves = []
+    curve_biases = {}
+    for nodes, bias in set_biases:
+        # Sets without nodes would fall back to the selection, so skip them
+        if not nodes:
+            continue
+        for curve in get_tween_curves(nodes) or []:
+            if curve not in curve_biases:
+                curve_biases[curve] = bias
+                curves.append(curve)
+    if not curves:
+        return
+    mc.waitCursor(state=True)
+    try:
+        curve_data = get_curve_data(curves, mc.currentTime(q=True))
+        biases = [curve_biases[curve] for curve in curve_data.curves]
+        values, in_tangents, out_tangents = compute_tween(curve_data,
+                                                          biases)
+        with write_block(SETTINGS["use_fast_write"]):
+            write_keys(curve_data.curves, currenttime, values, in_tangents,
+                       out_tangents)
+    finally:
+        mc.waitCursor(state=False)
+        restore_time_and_focus(currenttime)
+
+
+@profile_phase("discovery")
+def get_tween_curves(nodes=None):
+    """
+    Return the anim curves to tween for the specified nodes (or the current
+    selection), or None if there is nothing to tween
+    """
+    if isinstance(nodes, list) and not nodes:
+        nodes = None
+    attributes = mc.channelBox("mainChannelBox", q=True, sma=True)
+    # Reuse the curves from the last tween if nothing has changed since
+    curves = CURVE_CACHE.get(nodes, attributes)
+    if curves is not None:
+        return list(curves)
     # Figure out which nodes to pull from
     if nodes is not None:
         pullfrom = nodes
     else:
         pullfrom = mc.ls(sl=True)
         if not pullfrom:
-            return
+            return None
     # If attributes are selected, use them to build curve node list
-    attributes = mc.channelBox("mainChannelBox", q=True, sma=True)
     if attributes:
+        plugs = ["%s.%s" % (node, attr)
+                 for attr in attributes for node in pullfrom]
+        # Drop the plugs that don't exist, then find all of the curves for
+        # the rest in a single query
+        plugs = mc.ls(plugs)
         curves = []
-        for attr in attributes:
-            for node in pullfrom:
-                fullnode = "%s.%s" % (node, attr)
-                if not mc.objExists(fullnode):
-                    continue
-                tmp = mc.keyframe(fullnode, q=True, name=True)
-                if not tmp:
-                    continue
-                curves += tmp
+        if plugs:
+            curves = mc.keyframe(plugs, q=True, name=True)
     # Otherwise get curves for all nodes
     else:
         curves = mc.keyframe(pullfrom, q=True, name=True)
-    mc.waitCursor(state=True)
-    # Wrap the main operation in a try/except to prevent the waitcursor from
-    # sticking if something should fail
+    # If we have no curves, force a list
+    if curves is None:
+        curves = []
+    CURVE_CACHE.set(nodes, attributes, curves)
+    return list(curves)
+
+
+def restore_time_and_focus(currenttime):
+    """
+    Reset the current time and give focus back to the main Maya window after
+    a tween
+    """
+    mc.currentTime(currenttime)
+    mel.eval("global string $gMainWindow;")
+    windowname = mel.eval("$temp = $gMainWindow")
+    mc.setFocus(windowname)
+
+
+def _tangent_codes():
+    """
+    Return a dictionary mapping MFnAnimCurve tangent types to the tangent
+    codes used by tween_core
+    """
+    codes = {}
+    for attr, name in (("kTangentGlobal", "global"),
+                       ("kTangentFixed", "fixed"),
+                       ("kTangentLinear", "linear"),
+                       ("kTangentFlat", "flat"),
+                       ("kTangentSmooth", "spline"),
+                       ("kTangentStep", "step"),
+                       ("kTangentSlow", "slow"),
+                       ("kTangentFast", "fast"),
+                       ("kTangentClamped", "clamped"),
+                       ("kTangentPlateau", "plateau"),
+                       ("kTangentStepNext", "stepnext"),
+                       ("kTangentAuto", "auto"),
+                       ("kTangentAutoMix", "automix"),
+                       ("kTangentAutoEase", "autoease"),
+                       ("kTangentAutoCustom", "autocustom")):
+        # Older versions of Maya don't have every tangent type
+        if hasattr(oma.MFnAnimCurve, attr):
+            codes[getattr(oma.MFnAnimCurve, attr)] = \
+                tween_core.TANGENT_CODES[name]
+    return codes
+
+
+def _tangent_code(tangent_codes, tangent_type, curve, index, flag):
+    """
+    Return the tween_core code for an MFnAnimCurve tangent type.  Types that
+    aren't in the table (from newer versions of Maya) are looked up by name
+    with the keyTangent command and remembered in tangent_codes.  flag is
+    "itt" or "ott".
+    """
     try:
-        # If we have no curves, force a list
-        if curves is None:
-            curves = []
-        # Process all curves
-        for curve in curves:
-            # Find time for next and previous keys...
-            time_prev = mc.findKeyframe(curve, which="previous")
-            time_next = mc.findKeyframe(curve, which="next")
-            # Find previous and next tangent types
-            try:
-                in_tan_prev = mc.keyTangent(curve, time=(time_prev,), q=True,
-                                            itt=True)[0]
-                out_tan_prev = mc.keyTangent(curve, time=(time_prev,), q=True,
-                                             ott=True)[0]
-                in_tan_next = mc.keyTangent(curve, time=(time_next,), q=True,
-                                            itt=True)[0]
-                out_tan_next = mc.keyTangent(curve, time=(time_next,), q=True,
-                                             ott=True)[0]
-            # Workaround for keyTangent error in Maya 2016 Extension 2
-            except RuntimeError:
-                in_tan_prev = mel.eval("keyTangent -time %s -q -itt %s" % (time_prev, curve))[0]
-                out_tan_prev = mel.eval("keyTangent -time %s -q -ott %s" % (time_prev, curve))[0]
-                in_tan_next = mel.eval("keyTangent -time %s -q -itt %s" % (time_next, curve))[0]
-                out_tan_next = mel.eval("keyTangent -time %s -q -ott %s" % (time_next, curve))[0]
-            # Set new in and out tangent types
-            in_tan_new = out_tan_prev
-            out_tan_new = in_tan_next
-            # However, if any of the types (previous or next) is "fixed",
-            # use the global (default) tangent instead
-            if "fixed" in [in_tan_prev, out_tan_prev, in_tan_next, out_tan_next]:
-                in_tan_new = mc.keyTangent(q=True, g=True, itt=True)[0]
-                out_tan_new = mc.keyTangent(q=True, g=True, ott=True)[0]
-            elif out_tan_next == "step":
-                out_tan_new = out_tan_next
-            # Find previous and next key values
-            value_prev = mc.keyframe(curve, time=(time_prev,), q=True,
-                                     valueChange=True)[0]
-            value_next = mc.keyframe(curve, time=(time_next,), q=True,
-                                     valueChange=True)[0]
-            value_new = value_prev + ((value_next - value_prev) * bias)
-            # Set new keyframe and tangents
-            mc.setKeyframe(curve, t=(currenttime,), v=value_new,
-                           ott=out_tan_new)
-            if in_tan_new != "step":
-                mc.keyTangent(curve, t=(currenttime,), itt=in_tan_new)
-            # If we're using the special tick, set that appropriately
-            if SETTINGS["use_special_tick"]:
-                mc.keyframe(curve, tds=True, t=(currenttime,))
-    except:
-        raise
+        return tangent_codes[tangent_type]
+    except KeyError:
+        name = mc.keyTangent(curve, index=(index, index), q=True,
+                             **{flag: True})[0]
+        code = tween_core.tangent_code(name)
+        tangent_codes[tangent_type] = code
+        return code
+
+
+def _ui_value_converter(curvefn):
+    """
+    Return a function that converts the internal values of the given
+    time-input curve to the UI units used by the keyframe and setKeyframe
+    commands
+    """
+    curvetype = curvefn.animCurveType
+    if curvetype == oma.MFnAnimCurve.kAnimCurveTA:
+        unit = om.MAngle.uiUnit()
+        return lambda value: om.MAngle(value).asUnits(unit)
+    if curvetype == oma.MFnAnimCurve.kAnimCurveTL:
+        unit = om.MDistance.uiUnit()
+        return lambda value: om.MDistance(value).asUnits(unit)
+    return lambda value: value
+
+
+def _get_curve_fns(curves):
+    """
+    Return a list of (name, MFnAnimCurve) pairs for the named curves, looked
+    up through a single selection list
+    """
+    # Duplicate names would collapse in the selection list
+    curves = list(dict.fromkeys(curves))
+    selection = om.MSelectionList()
+    for curve in curves:
+        selection.add(curve)
+    return [(curve, oma.MFnAnimCurve(selection.getDependNode(index)))
+            for index, curve in enumerate(curves)]
+
+
+@profile_phase("gather")
+def get_curve_data(curves, time):
+    """
+    Collect the times, values and tangent types of the keys before and after
+    the given time for every curve in a single pass through the API.  Like
+    findKeyframe, the search wraps around the ends of the curve.  Curves
+    that aren't driven by time (set driven keys) are skipped.
+    """
+    data = tween_core.TMCurveData()
+    tangent_codes = _tangent_codes()
+    search_time = om.MTime(time, om.MTime.uiUnit())
+    for curve, curvefn in _get_curve_fns(curves):
+        numkeys = curvefn.numKeys
+        # findClosest and input only work on time-input curves
+        if not numkeys or curvefn.isUnitlessInput:
+            continue
+        # Find the closest key, then step to the keys on either side of it
+        closest = curvefn.findClosest(search_time)
+        closest_time = curvefn.input(closest)
+        if closest_time < search_time:
+            prev_index, next_index = closest, closest + 1
+        elif closest_time > search_time:
+            prev_index, next_index = closest - 1, closest
+        else:
+            prev_index, next_index = closest - 1, closest + 1
+        prev_index %= numkeys
+        next_index %= numkeys
+        to_ui = _ui_value_converter(curvefn)
+        data.curves.append(curve)
+        data.time_prev.append(curvefn.input(prev_index).asUnits(
+            om.MTime.uiUnit()))
+        data.time_next.append(curvefn.input(next_index).asUnits(
+            om.MTime.uiUnit()))
+        data.value_prev.append(to_ui(curvefn.value(prev_index)))
+        data.value_next.append(to_ui(curvefn.value(next_index)))
+        data.in_tan_prev.append(_tangent_code(
+            tangent_codes, curvefn.inTangentType(prev_index), curve,
+            prev_index, "itt"))
+        data.out_tan_prev.append(_tangent_code(
+            tangent_codes, curvefn.outTangentType(prev_index), curve,
+            prev_index, "ott"))
+        data.in_tan_next.append(_tangent_code(
+            tangent_codes, curvefn.inTangentType(next_index), curve,
+            next_index, "itt"))
+        data.out_tan_next.append(_tangent_code(
+            tangent_codes, curvefn.outTangentType(next_index), curve,
+            next_index, "ott"))
+    PROFILER.count("curves", len(data))
+    return data
+
+
+@profile_phase("gather")
+def get_curve_keys(curves):
+    """
+    Collect the times, values and tangent types of every key on every curve
+    in a single pass through the API.  Curves that aren't driven by time are
+    skipped.
+    """
+    keys = tween_core.TMCurveKeys()
+    tangent_codes = _tangent_codes()
+    time_unit = om.MTime.uiUnit()
+    for curve, curvefn in _get_curve_fns(curves):
+        numkeys = curvefn.numKeys
+        if not numkeys or curvefn.isUnitlessInput:
+            continue
+        to_ui = _ui_value_converter(curvefn)
+        indices = range(numkeys)
+        keys.curves.append(curve)
+        keys.times.append([curvefn.input(i).asUnits(time_unit)
+                           for i in indices])
+        keys.values.append([to_ui(curvefn.value(i)) for i in indices])
+        keys.in_tangents.append([
+            _tangent_code(tangent_codes, curvefn.inTangentType(i), curve, i,
+                          "itt") for i in indices])
+        keys.out_tangents.append([
+            _tangent_code(tangent_codes, curvefn.outTangentType(i), curve, i,
+                          "ott") for i in indices])
+    PROFILER.count("curves", len(keys))
+    return keys
+
+
+def global_tangents():
+    """
+    Return the global (default) in and out tangent types
+    """
+    return (mc.keyTangent(q=True, g=True, itt=True)[0],
+            mc.keyTangent(q=True, g=True, ott=True)[0])
+
+
+@contextlib.contextmanager
+def write_block(fast=False):
+    """
+    Group all of the edits made inside the block into a single undo chunk.
+    In fast mode, viewport refresh is also suspended until the block exits,
+    so the scene isn't redrawn after every key.
+    """
+    mc.undoInfo(openChunk=True, chunkName="tweenMachine")
+    if fast:
+        mc.refresh(suspend=True)
+    try:
+        yield
     finally:
-        mc.waitCursor(state=False)
-        mc.currentTime(currenttime)
-        mel.eval("global string $gMainWindow;")
-        windowname = mel.eval("$temp = $gMainWindow")
-        mc.setFocus(windowname)
+        if fast:
+            mc.refresh(suspend=False)
+        mc.undoInfo(closeChunk=True)
+
+
+@profile_phase("compute")
+def compute_tween(curve_data, bias):
+    """
+    Compute the new values and tangent types for the given TMCurveData
+    """
+    return tween_core.compute_tween(curve_data, bias, global_tangents)
+
+
+@profile_phase("write")
+def write_keys(curves, time, values, in_tangents, out_tangents):
+    """
+    Write the new keys at the given time, batching the tangent and tick
+    edits into as few commands as possible
+    """
+    PROFILER.count("keys", len(curves))
+    curves_by_in_tangent = {}
+    for curve, value, in_tan, out_tan in zip(curves, values, in_tangents,
+                                             out_tangents):
+        mc.setKeyframe(curve, t=(time,), v=value, ott=out_tan)
+        if in_tan != "step":
+            curves_by_in_tangent.setdefault(in_tan, []).append(curve)
+    for in_tan, tangent_curves in curves_by_in_tangent.items():
+        mc.keyTangent(tangent_curves, t=(time,), itt=in_tan)
+    # If we're using the special tick, set that appropriately
+    if curves and SETTINGS["use_special_tick"]:
+        mc.keyframe(curves, tds=True, t=(time,))
+
+
+@profile_phase("write")
+def set_key_values(curves, time, values):
+    """
+    Change the values of keys that already exist at the given time, leaving
+    their tangent types alone
+    """
+    for curve, value in zip(curves, values):
+        mc.keyframe(curve, e=True, t=(time,), absolute=True, valueChange=value)
+
+
+def get_uuids(nodes):
+    """
+    Return the UUID of each node, or an empty string for nodes that don't
+    exist or aren't unique
+    """
+    uuids = []
+    for node in nodes:
+        selection = om.MSelectionList()
+        try:
+            selection.add(node)
+        except RuntimeError:
+            uuids.append("")
+            continue
+        nodefn = om.MFnDependencyNode(selection.getDependNode(0))
+        uuids.append(nodefn.uuid().asString())
+    return uuids
+
+
+def default_data():
+    """
+    Return the data for a scene without any tweenMachine data
+    """
+    return {"version": DATA_VERSION,
+            "buttons": {"height": SETTINGS["button_height"],
+                        "buttons": [[value, list(color)] for value, color
+                                    in SETTINGS["default_button_data"]]},
+            "groups": []}
+
+
+def encode_nodes(nodes):
+    """
+    Pack a list of node names into a compressed string
+    """
+    packed = zlib.compress("\n".join(nodes).encode("utf-8"))
+    return base64.b64encode(packed).decode("ascii")
+
+
+def decode_nodes(text):
+    """
+    Unpack a list of node names packed by encode_nodes
+    """
+    if not text:
+        return []
+    names = zlib.decompress(base64.b64decode(text)).decode("utf-8")
+    return names.split("\n") if names else []
+
+
+def encode_data(data):
+    """
+    Convert the data for a scene to the string stored on the data node
+    """
+    return json.dumps(data, separators=(",", ":"))
+
+
+def decode_data(text):
+    """
+    Read the string stored on the data node.  Older XML data is converted to
+    the current format.
+    """
+    if text.lstrip().startswith("<"):
+        return convert_xml_data(text)
+    data = json.loads(text)
+    if data.get("version", 0) > DATA_VERSION:
+        mc.warning("tweenMachine data was saved by a newer version.  Some "
+                   "data may not load properly.")
+    return data
+
+
+def convert_xml_data(text):
+    """
+    Convert XML data from earlier versions of tweenMachine
+    """
+    import xml.etree.ElementTree as etree
+    root = etree.XML(text)
+    data = {"version": DATA_VERSION, "buttons": {"height": 8, "buttons": []},
+            "groups": []}
+    buttons_element = root.find("buttons")
+    if buttons_element is not None:
+        data["buttons"]["height"] = int(buttons_element.get("height", 8))
+        for element in buttons_element.findall("button"):
+            data["buttons"]["buttons"].append(
+                _convert_button(element.get("value"), element.get("rgb")))
+    groups_element = root.find("groups")
+    if groups_element is not None:
+        for group_element in groups_element.findall("group"):
+            group = {"name": group_element.get("name"),
+                     "index": int(group_element.get("index", 0)),
+                     "sets": []}
+            for set_element in group_element.findall("set"):
+                group["sets"].append(
+                    {"name": set_element.get("name"),
+                     "index": int(set_element.get("index", 0)),
+                     "nodes": encode_nodes(
+                         (set_element.text or "").split())})
+            data["groups"].append(group)
+    return data
+
+
+def _convert_button(value, rgb):
+    """
+    Convert the value and color strings of a button from older data
+    """
+    return [float(value), [float(c) for c in rgb.replace(",", " ").split()]]
+
+
+def _read_attribute(nodes, attribute):
+    """
+    Read an attribute from many nodes through the API, returning one value
+    per name in nodes (a name given twice is only read once).  The nodes
+    must be unique (long) names.  Nodes that don't have the attribute give
+    None.
+    """
+    # A selection list merges duplicate nodes, so look each name up on its
+    # own to keep the values lined up with the names
+    selection = om.MSelectionList()
+    found = {}
+    for node in nodes:
+        if node in found:
+            continue
+        selection.clear()
+        selection.add(node)
+        nodefn = om.MFnDependencyNode(selection.getDependNode(0))
+        if not nodefn.hasAttribute(attribute):
+            found[node] = None
+            continue
+        plug = nodefn.findPlug(attribute, False)
+        if plug.attribute().hasFn(om.MFn.kTypedAttribute):
+            found[node] = plug.asString()
+        else:
+            found[node] = plug.asDouble()
+    return [found[node] for node in nodes]
+
+
+def convert_legacy_data():
+    """
+    Convert the node-based data from the original MEL tweenMachine.  The
+    whole hierarchy is found with a handful of queries and the attributes are
+    read through the API, so large libraries convert quickly.
+    """
+    data = default_data()
+    # Convert option data
+    slider_vis_nodes = mc.ls("tmSliderVis*", long=True)
+    button_vis_nodes = mc.ls("tmButtonVis*", long=True) or slider_vis_nodes
+    slider_vis_value, button_vis_value = _read_attribute(
+        [slider_vis_nodes[0], button_vis_nodes[0]], "data")
+    if int(slider_vis_value) and int(button_vis_value):
+        show_mode = "both"
+    else:
+        if int(slider_vis_value):
+            show_mode = "slider"
+        else:
+            show_mode = "buttons"
+    SETTINGS["show_mode"] = show_mode
+    # Convert button data
+    buttons_node = mc.ls("tmButtons*")[0]
+    suffixes = [node[-1] for node in
+                mc.listRelatives(buttons_node, children=True) or []]
+    colors = _read_attribute(["tmButtonRGB%s" % suffix
+                              for suffix in suffixes], "data")
+    values = _read_attribute(["tmButtonValue%s" % suffix
+                              for suffix in suffixes], "data")
+    data["buttons"]["buttons"] = [_convert_button(str(value), str(color))
+                                  for value, color in zip(values, colors)]
+    # Find every group, set and object node with one query per level
+    group_node = mc.ls("tmGroups*")[0]
+    group_nodes = mc.ls(group_node + "|tmGroup*", long=True)
+    set_nodes = []
+    object_nodes = []
+    if group_nodes:
+        set_nodes = mc.listRelatives(group_nodes, children=True,
+                                     fullPath=True) or []
+    if set_nodes:
+        object_nodes = mc.listRelatives(set_nodes, children=True,
+                                        fullPath=True) or []
+    # Read the attributes of each level in one pass
+    group_ids = _read_attribute(group_nodes, "id")
+    group_orders = _read_attribute(group_nodes, "order")
+    set_ids = _read_attribute(set_nodes, "id")
+    set_orders = _read_attribute(set_nodes, "order")
+    object_names = _read_attribute(object_nodes, "data")
+    # Rebuild the hierarchy from the long names
+    set_objects = collections.defaultdict(list)
+    for objnode, name in zip(object_nodes, object_names):
+        set_objects[objnode.rsplit("|", 1)[0]].append(str(name))
+    group_sets = collections.defaultdict(list)
+    for setnode, setname, setorder in zip(set_nodes, set_ids, set_orders):
+        group_sets[setnode.rsplit("|", 1)[0]].append(
+            {"name": str(setname),
+             "index": int(setorder),
+             "nodes": encode_nodes(set_objects[setnode])})
+    for node, gname, gorder in zip(group_nodes, group_ids, group_orders):
+        data["groups"].append({"name": str(gname),
+                               "index": int(gorder),
+                               "sets": group_sets[node]})
+    return data
+
+
+def convert_scene_files(directory, patterns=("*.ma", "*.mb")):
+    """
+    Convert the old tweenMachine data in every scene file in a directory and
+    save the scenes.  Meant to be run headless from mayapy:
+
+        import maya.standalone
+        maya.standalone.initialize()
+        import tools.tweenMac as tweenMac
+        tweenMac.convert_scene_files("/path/to/scenes")
+
+    Returns the list of scenes that were converted.
+    """
+    paths = []
+    for pattern in patterns:
+        paths += glob.glob(os.path.join(directory, pattern))
+    converted = []
+    for path in sorted(paths):
+        mc.file(path, open=True, force=True, prompt=False)
+        # Skip scenes without old data, or that were already converted
+        if not mc.ls("tmXML*") or mc.ls("tweenMachineData"):
+            continue
+        TMData()
+        mc.file(save=True, force=True)
+        converted.append(path)
+        print("# tweenMachine: Converted %s" % path)
+    return converted
+
+
+def fetch_latest_version(url=UPDATE_URL, timeout=UPDATE_TIMEOUT):
+    """
+    Return the latest tweenMachine version published at the URL, or None if
+    it can't be reached within the timeout
+    """
+    import http.client
+    import urllib.error
+    import urllib.request
+    try:
+        link = urllib.request.urlopen(url, timeout=timeout)
+        try:
+            if link.getcode() != 200:
+                return None
+            return link.read().decode("utf-8", "replace").strip()
+        finally:
+            link.close()
+    except (urllib.error.URLError, http.client.HTTPException, OSError,
+            ValueError) as error:
+        logger.debug("tweenMachine update check failed: %s", error)
+        return None
+
+
+def update_cache_path():
+    """
+    Return the path of the file that caches the last update check
+    """
+    return os.path.join(mc.internalVar(userAppDir=True),
+                        "tweenMachineUpdate.json")
+
+
+def read_update_cache(path, url, ttl=UPDATE_CACHE_TTL):
+    """
+    Return the cached result of the last update check as a (found, version)
+    pair.  found is False if there's no result for the URL that's newer than
+    the TTL.
+    """
+    try:
+        with open(path) as cachefile:
+            cache = json.load(cachefile)
+    except (OSError, ValueError):
+        return False, None
+    if cache.get("url") != url or _time.time() - cache.get("checked", 0) > ttl:
+        return False, None
+    return True, cache.get("version")
+
+
+def write_update_cache(path, url, version):
+    """
+    Cache the result of an update check.  Failed checks are cached too, so
+    offline machines don't try again until the TTL runs out.
+    """
+    try:
+        with open(path, "w") as cachefile:
+            json.dump({"url": url, "checked": _time.time(),
+                       "version": version}, cachefile)
+    except OSError as error:
+        logger.debug("Couldn't cache the update check: %s", error)
+
+
+def report_update(version):
+    """
+    Tell the user if the version found by the update check is different from
+    this one
+    """
+    if version is None:
+        return
+    if version != __version__:
+        mc.warning("A new version of tweenMachine is available (%s)" % version)
+    else:
+        print("# tweenMachine: Versions match")
+
+
+def check_for_update(url=UPDATE_URL, timeout=UPDATE_TIMEOUT,
+                     ttl=UPDATE_CACHE_TTL, cache_path=None,
+                     report=report_update, defer=None):
+    """
+    Check for a newer version without blocking Maya.  A cached result that's
+    newer than the TTL is used if there is one; otherwise the URL is fetched
+    on a background thread.  Either way report() is called with the version
+    (or None) on the main thread, through defer().  Returns the thread, or
+    None if the cached result was used.
+    """
+    import threading
+    if cache_path is None:
+        cache_path = update_cache_path()
+    if defer is None:
+        import maya.utils
+        defer = maya.utils.executeDeferred
+    found, version = read_update_cache(cache_path, url, ttl)
+    if found:
+        defer(report, version)
+        return None
+
+    def _check():
+        latest = fetch_latest_version(url, timeout)
+        write_update_cache(cache_path, url, latest)
+        defer(report, latest)
+
+    thread = threading.Thread(target=_check, name="tweenMachineUpdateCheck")
+    thread.daemon = True
+    thread.start()
+    return thread
 
 
 # -------------------------------------------------------------------------
 # ----------------------------------------------------------- Classes -----
 
+class TMProfiler(object):
+    """
+    Records the wall time of each phase, the number of maya.cmds calls and
+    the number of curves and keys for every tween call.  Records are kept in
+    a ring buffer of the most recent calls.  Profiling is off by default, and
+    costs only a flag check per phase while it's off.
+    """
+
+    def __init__(self, size=50):
+        self.enabled = False
+        self.log_summary = False
+        self.records = collections.deque(maxlen=size)
+        self._current = None
+
+    @contextlib.contextmanager
+    def record(self, name):
+        """
+        Profile everything done inside the block as a single call.  While
+        recording, maya.cmds is swapped for a proxy that counts the calls.
+        """
+        global mc
+        if not self.enabled or self._current is not None:
+            yield None
+            return
+        record = TMProfileRecord(name)
+        commands = mc
+        mc = TMCountingCommands(commands, record.calls)
+        self._current = record
+        start = _time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.total = _time.perf_counter() - start
+            mc = commands
+            self._current = None
+            self.records.append(record)
+            if self.log_summary:
+                logger.info(record.summary())
+
+    def add_phase_time(self, phase, elapsed):
+        """
+        Add time to a phase of the current record
+        """
+        phases = self._current.phases
+        phases[phase] = phases.get(phase, 0.0) + elapsed
+
+    def count(self, name, number):
+        """
+        Add to one of the counts (curves, keys...) of the current record
+        """
+        if self._current is not None:
+            self._current.counts[name] += number
+
+    def last(self):
+        """
+        Return the most recent record, or None if there aren't any
+        """
+        if self.records:
+            return self.records[-1]
+        return None
+
+    def summary(self):
+        """
+        Return a summary of all records in the buffer
+        """
+        return "\n".join(record.summary() for record in self.records)
+
+    def clear(self):
+        """
+        Remove all records
+        """
+        self.records.clear()
+
+
+class TMProfileRecord(object):
+    """
+    Timing and count data for a single profiled tween call
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.total = 0.0
+        self.phases = collections.OrderedDict()
+        self.calls = collections.Counter()
+        self.counts = collections.Counter()
+
+    def summary(self):
+        """
+        Return a readable summary of the record
+        """
+        lines = ["# tweenMachine: %s %.2f ms (%s)"
+                 % (self.name, self.total * 1000.0,
+                    ", ".join("%d %s" % (number, name)
+                              for name, number in self.counts.items()))]
+        for phase, elapsed in self.phases.items():
+            lines.append("#     %-10s %8.2f ms" % (phase, elapsed * 1000.0))
+        for command, number in self.calls.most_common():
+            lines.append("#     mc.%-20s %6d calls" % (command, number))
+        return "\n".join(lines)
+
+
+class TMCountingCommands(object):
+    """
+    Stand-in for maya.cmds that counts the calls made to each command
+    """
+
+    def __init__(self, commands, calls):
+        self._commands = commands
+        self._calls = calls
+
+    def __getattr__(self, name):
+        command = getattr(self._commands, name)
+
+        def counted(*args, **kwds):
+            self._calls[name] += 1
+            return command(*args, **kwds)
+        return counted
+
+
+class TMUuidCache(object):
+    """
+    Per-session map of node UUIDs to long node names, used to find the nodes
+    of a set after they're renamed or moved.  UUIDs that aren't in the map are
+    looked up together with a single ls call.  The map is cleared when nodes
+    are renamed or reparented, a scene is opened, or references are loaded.
+    The callbacks that do that only exist while the tweenMachine window is
+    open; otherwise nothing is kept between calls.
+    """
+
+    def __init__(self):
+        self._paths = {}
+        self._jobs = []
+        self._callbacks = []
+        # Number of windows using the cache
+        self._users = 0
+        # Changes every time the map is cleared, so users of resolved names
+        # know when to resolve them again
+        self.generation = 0
+
+    def resolve(self, uuids, names):
+        """
+        Return the current long name for each UUID, or the stored name when
+        the UUID is unknown or can't be found in the scene
+        """
+        # Without the callbacks the map can't be trusted, so start over
+        if not self.installed:
+            self.clear()
+        missing = [uuid for uuid in uuids if uuid and uuid not in self._paths]
+        if missing:
+            self._lookup(missing)
+        nodes = []
+        for uuid, name in zip(uuids, names):
+            paths = self._paths.get(uuid) if uuid else None
+            if not paths:
+                nodes.append(name)
+            elif len(paths) == 1:
+                nodes.append(paths[0])
+            else:
+                # The same file referenced more than once gives several nodes
+                # with the same UUID, so use the one with the stored name
+                shortname = name.rsplit("|", 1)[-1]
+                matches = [path for path in paths
+                           if path.rsplit("|", 1)[-1] == shortname]
+                nodes.append(matches[0] if matches else name)
+        return nodes
+
+    def _lookup(self, uuids):
+        """
+        Find the long names of the given UUIDs
+        """
+        # Remember UUIDs that aren't found so they aren't looked up again
+        for uuid in uuids:
+            self._paths[uuid] = []
+        paths = mc.ls(uuids, long=True) or []
+        for path, uuid in zip(paths, get_uuids(paths)):
+            self._paths.setdefault(uuid, []).append(path)
+
+    def clear(self, *args):
+        """
+        Forget all known UUIDs
+        """
+        self._paths.clear()
+        self.generation += 1
+
+    def install(self):
+        """
+        Create the scriptJobs and callbacks that clear the map, if they don't
+        already exist.  Every install needs a matching uninstall.
+        """
+        self._users += 1
+        if self._jobs:
+            return
+        for event in ("NameChanged", "SceneOpened", "NewSceneOpened",
+                      "Undo", "Redo"):
+            self._jobs.append(mc.scriptJob(event=[event, self.clear]))
+        for message in (om.MSceneMessage.kAfterLoadReference,
+                        om.MSceneMessage.kAfterUnloadReference,
+                        om.MSceneMessage.kAfterImport):
+            self._callbacks.append(
+                om.MSceneMessage.addCallback(message, self.clear))
+        self._callbacks.append(om.MDagMessage.addParentAddedCallback(
+            self.clear))
+
+    def uninstall(self, force=False):
+        """
+        Remove the scriptJobs and callbacks and clear the map once nothing
+        that installed it is left, or straight away if force is set
+        """
+        self._users = 0 if force else max(self._users - 1, 0)
+        if self._users:
+            return
+        for job in self._jobs:
+            if mc.scriptJob(exists=job):
+                mc.scriptJob(kill=job, force=True)
+        if self._callbacks:
+            om.MMessage.removeCallbacks(self._callbacks)
+        self._jobs = []
+        self._callbacks = []
+        self.clear()
+
+    # Properties
+
+    def _get_installed(self):
+        """
+        Return whether the scriptJobs and callbacks exist
+        """
+        return bool(self._jobs)
+
+    installed = property(_get_installed)
+
+
+class TMCurveCache(object):
+    """
+    Cache of the anim curves found for a list of nodes (or the current
+    selection) and the selected channel box attributes.  The cache is cleared
+    whenever the selection changes, a scene is opened, an undo or redo
+    happens, or anim curves are added, removed or reconnected.  The cache is
+    only used while its callbacks are installed, which the tweenMachine window
+    does for as long as it's open.
+    """
+
+    def __init__(self):
+        self._curves = {}
+        self._jobs = []
+        self._callbacks = []
+        # Number of windows using the cache
+        self._users = 0
+
+    def _key(self, nodes, attributes):
+        """
+        Return the cache key for the given nodes and attributes.  No nodes
+        means the current selection, which is covered by the scriptJobs.
+        """
+        if nodes is not None:
+            nodes = tuple(nodes)
+        return nodes, tuple(attributes or ())
+
+    def get(self, nodes, attributes):
+        """
+        Return the cached curves, or None if there aren't any
+        """
+        if not self._jobs:
+            return None
+        return self._curves.get(self._key(nodes, attributes))
+
+    def set(self, nodes, attributes, curves):
+        """
+        Store the curves found for the given nodes and attributes, if the
+        cache is installed
+        """
+        if not self._jobs:
+            return
+        self._curves[self._key(nodes, attributes)] = tuple(curves)
+
+    def clear(self, *args):
+        """
+        Forget all cached curves
+        """
+        self._curves.clear()
+
+    def install(self):
+        """
+        Create the scriptJobs and callbacks that clear the cache, if they don't
+        already exist.  Every install needs a matching uninstall.
+        """
+        self._users += 1
+        if self._jobs:
+            return
+        for event in ("SelectionChanged", "SceneOpened", "NewSceneOpened",
+                      "Undo", "Redo"):
+            self._jobs.append(mc.scriptJob(event=[event, self.clear]))
+        self._callbacks.append(
+            om.MDGMessage.addNodeAddedCallback(self.clear, "animCurve"))
+        self._callbacks.append(
+            om.MDGMessage.addNodeRemovedCallback(self.clear, "animCurve"))
+        self._callbacks.append(
+            om.MDGMessage.addConnectionCallback(self.clear))
+
+    def uninstall(self, force=False):
+        """
+        Remove the scriptJobs and callbacks and clear the cache once nothing
+        that installed it is left, or straight away if force is set
+        """
+        self._users = 0 if force else max(self._users - 1, 0)
+        if self._users:
+            return
+        for job in self._jobs:
+            if mc.scriptJob(exists=job):
+                mc.scriptJob(kill=job, force=True)
+        if self._callbacks:
+            om.MMessage.removeCallbacks(self._callbacks)
+        self._jobs = []
+        self._callbacks = []
+        self.clear()
+
+
+class TMDragTween(object):
+    """
+    Live tween for slider drags.  The surrounding key data is cached when the
+    drag starts, so each drag tick only recomputes and sets the key values.
+    All of the edits made during the drag are undone as a single chunk.
+    """
+
+    def __init__(self, nodes=None):
+        self.time = mc.timeControl("timeControl1", q=True, ra=True)[0]
+        self.keyed = False
+        curves = get_tween_curves(nodes)
+        if curves is None:
+            curves = []
+        self.data = get_curve_data(curves, mc.currentTime(q=True))
+        self.in_tangents, self.out_tangents = tween_core.compute_tangents(
+            self.data, global_tangents)
+        mc.undoInfo(openChunk=True, chunkName="tweenMachine")
+
+    def update(self, bias):
+        """
+        Set the keys for the given bias using the cached key data
+        """
+        values = tween_core.compute_values(self.data, bias)
+        # The first tick makes the keys; after that only the values change
+        if self.keyed:
+            set_key_values(self.data.curves, self.time, values)
+        else:
+            write_keys(self.data.curves, self.time, values, self.in_tangents,
+                       self.out_tangents)
+            self.keyed = True
+
+    def finish(self, bias):
+        """
+        Set the final keys and close the undo chunk
+        """
+        try:
+            self.update(bias)
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Close the undo chunk and restore the time and focus, without setting
+        any more keys
+        """
+        mc.undoInfo(closeChunk=True)
+        restore_time_and_focus(self.time)
+
+
 class TMData(object):
     """
     Core code for data organization (groups and sets)
@@ -203,97 +1338,42 @@ class TMData(object):
 
     def __init__(self):
         # Try to read preferences from option variables; otherwise use defaults
-        self.element = None
         self.node = None
         self.name = "selected"
         self.groups = []
-        # Try to read the existing XML data
+        self._batch_depth = 0
+        self._dirty = False
+        self._flush_pending = False
+        # Index of node -> sets, built the first time it's needed
+        self._membership = None
+        # Try to read the existing data
         oldnodes = mc.ls("tmXML*")
         newnodes = mc.ls("tweenMachineData")
-        #        if True:
-        #            return
-        if oldnodes:
+        if newnodes:
+            self.node = newnodes[0]
+            text = mc.getAttr(self.node + ".data")
+            self.root = decode_data(text) if text else default_data()
+            # Older XML data is converted to the current format
+            self._dirty = not text or text.lstrip().startswith("<")
+        elif oldnodes:
             # If we have more than one, use the first one, but warn the user
-            self.node = oldnodes[0]
+            oldnode = oldnodes[0]
             if len(oldnodes) > 1:
                 mc.warning("Multiple tweenMachine data nodes found.  Using"
-                           + self.node)
+                           + oldnode)
             # If the data is in the old format (tmXML has children), convert it
-            if mc.listRelatives(self.node, children=True):
+            if mc.listRelatives(oldnode, children=True):
                 print("# tweenMachine: Old data found.  Converting.")
-                self.root = etree.XML("<tweenMachineData />")
-                self.tree = etree.ElementTree(self.root)
-                # Create base elements
-                buttons_element = etree.SubElement(self.root, "buttons")
-                buttons_element.set("height", str(SETTINGS["button_height"]))
-                groups_element = etree.SubElement(self.root, "groups")
-                # Convert option data
-                slider_vis_node = mc.ls("tmSliderVis*")[0]
-                slider_vis_value = int(mc.getAttr(slider_vis_node + ".data"))
-                button_vis_node = mc.ls("tmSliderVis*")[0]
-                button_vis_value = int(mc.getAttr(button_vis_node + ".data"))
-                if slider_vis_value and button_vis_value:
-                    show_mode = "both"
-                else:
-                    if slider_vis_value:
-                        show_mode = "slider"
-                    else:
-                        show_mode = "buttons"
-                SETTINGS["show_mode"] = show_mode
-                # Convert button data
-                buttons_node = mc.ls("tmButtons*")[0]
-                for node in mc.listRelatives(buttons_node, children=True):
-                    suffix = node[-1]
-                    bcolor = str(mc.getAttr("tmButtonRGB%s.data" % suffix))
-                    bvalue = str(mc.getAttr("tmButtonValue%s.data" % suffix))
-                    button_element = etree.SubElement(buttons_element, "button")
-                    button_element.set("rgb", bcolor)
-                    button_element.set("value", bvalue)
-                # Convert groups and sets
-                group_node = mc.ls("tmGroups*")[0]
-                for node in mc.ls(group_node + "|tmGroup*"):
-                    # Get the group name and order
-                    gname = str(mc.getAttr(node + ".id"))
-                    gorder = str(mc.getAttr(node + ".order"))
-                    group_element = etree.SubElement(groups_element, "group")
-                    group_element.set("name", gname)
-                    group_element.set("index", gorder)
-                    # Get the sets in this group
-                    for setnode in mc.listRelatives(node, children=True):
-                        setname = str(mc.getAttr(setnode + ".id"))
-                        setorder = str(mc.getAttr(setnode + ".order"))
-                        # Create a set node and add the set objects to it
-                        set_element = etree.SubElement(group_element, "set")
-                        set_element.set("name", setname)
-                        set_element.set("index", setorder)
-                        setobjs = []
-                        for objnode in mc.listRelatives(setnode, children=True):
-                            setobjs.append(str(mc.getAttr(objnode + ".data")))
-                        set_element.text = " ".join(setobjs)
+                self.root = convert_legacy_data()
             # Otherwise get the data from the node
             else:
-                self.root = etree.XML(mc.getAttr(node + ".data"))
-                self.tree = etree.ElementTree(self.root)
+                self.root = decode_data(mc.getAttr(oldnode + ".data"))
+            self._dirty = True
         # Otherwise start from scratch
         else:
-            self.root = etree.XML("""<tweenMachineData>
-    <buttons height="%s">
-         <button rgb="0.6 0.6 0.6" value="-75" />
-         <button rgb="0.6 0.6 0.6" value="-60" />
-         <button rgb="0.6 0.6 0.6" value="-33" />
-         <button rgb="0.6 0.6 0.6" value="0" />
-         <button rgb="0.6 0.6 0.6" value="33" />
-         <button rgb="0.6 0.6 0.6" value="60" />
-         <button rgb="0.6 0.6 0.6" value="75" />
-    </buttons>
-    <groups />
-</tweenMachineData>
-""" % SETTINGS["button_height"])
-            self.tree = etree.ElementTree(self.root)
-        # Next: replace existing data with new XML data
-        if newnodes:
-            self.node = newnodes[0]
-        else:
+            self.root = default_data()
+            self._dirty = True
+        if self.node is None:
             # Capture former selection
             selection = mc.ls(sl=True)
             # Make the new data node
@@ -304,31 +1384,60 @@ class TMData(object):
                 mc.select(selection)
             else:
                 mc.select(clear=True)
-        self.save_data()
+        self.flush()
         # Erase old data nodes (FUTURE: ask user to confirm)
         if False:
             for node in oldnodes:
                 mc.delete(node)
         # Build groups and sets
-        self.group_root = self.root.find("groups")
-        for group in self.group_root.findall("group"):
+        for group in self.root["groups"]:
             # Build a group node
-            self.groups.append(TMGroup(group))
+            self.groups.append(TMGroup(self, group))
 
     def save_data(self):
         """
-        Save everything to the data node
+        Mark the data as changed.  Inside a batch, the data is written when
+        the outermost batch ends; otherwise the write is deferred until Maya
+        is idle, so that a burst of edits is only written once.
+        """
+        self._dirty = True
+        if self._batch_depth or self._flush_pending:
+            return
+        self._flush_pending = True
+        mc.evalDeferred(self.flush, lowestPriority=True)
+
+    def flush(self):
+        """
+        Save everything to the data node, if anything changed since the last
+        save
         """
-        mc.setAttr(self.node + ".data", etree.tostring(self.root), type="string")
+        self._flush_pending = False
+        if not self._dirty:
+            return
+        self._dirty = False
+        mc.setAttr(self.node + ".data", encode_data(self.root), type="string")
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Make several changes and save the data once, when the outermost
+        batch ends
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
 
     def add_group(self, name):
         """
         Add a named group
         """
-        element = etree.SubElement(self.group_root, "group")
-        element.set("name", name)
-        element.set("index", str(len(self.groups)))
-        self.groups.append(TMGroup(self, element))
+        record = {"name": name, "index": len(self.groups), "sets": []}
+        self.root["groups"].append(record)
+        self.groups.append(TMGroup(self, record))
         self.save_data()
 
     def remove_group(self, name):
@@ -337,26 +1446,69 @@ class TMData(object):
         """
         for group in self.groups:
             if group.name == name:
-                self.group_root.remove(group._element)
+                self.root["groups"].remove(group._record)
                 self.groups.remove(group)
+                for set_ in group.sets:
+                    self._unindex_set(set_, set_.keys)
                 break
         self.save_data()
 
+    def sets_containing(self, nodes):
+        """
+        Return the sets that contain any of the given nodes
+        """
+        if self._membership is None:
+            self._membership = collections.defaultdict(set)
+            for group in self.groups:
+                for set_ in group.sets:
+                    self._index_set(set_, set_.keys)
+        # Sets are indexed by UUID, or by name for nodes without one
+        keys = set(nodes)
+        keys.update(uuid for uuid in get_uuids(nodes) if uuid)
+        found = set()
+        for key in keys:
+            found.update(self._membership.get(key, ()))
+        return found
+
+    def _index_set(self, set_, keys):
+        """
+        Add the node keys of a set to the membership index
+        """
+        if self._membership is None:
+            return
+        for key in keys:
+            self._membership[key].add(set_)
+
+    def _unindex_set(self, set_, keys):
+        """
+        Remove the node keys of a set from the membership index
+        """
+        if self._membership is None:
+            return
+        for key in keys:
+            sets = self._membership.get(key)
+            if sets is not None:
+                sets.discard(set_)
+                if not sets:
+                    del self._membership[key]
+
 
 class TMGroup(object):
     """
     Container object for a collection of TMSet classes
     """
 
-    def __init__(self, data, element):
+    def __init__(self, data, record):
         self.data = data
         self.sets = []
-        self._element = element
-        self.index = self._element.get("index")
-        self.name = self._element.get("name")
-        # Build list of sets from XML data
-        for set_ in self._element.findall("set"):
-            self.sets.append(TMSet(set_))
+        self._nodes = None
+        self._nodes_generation = None
+        self._record = record
+        self.index = self._record["index"]
+        self.name = self._record["name"]
+        # Build list of sets from the stored data
+        for set_ in self._record["sets"]:
+            self.sets.append(TMSet(self, set_))
 
     def save_data(self):
         """
@@ -368,11 +1520,14 @@ class TMGroup(object):
         """
         Add the named set to affect the specified nodes
         """
-        element = etree.SubElement(self._element, "set")
-        element.set("name", name)
-        element.set("index", str(len(self.sets)))
-        element.text = " ".join(nodes)
-        self.sets.append(TMSet(self, element))
+        record = {"name": name, "index": len(self.sets),
+                  "nodes": encode_nodes(nodes),
+                  "uuids": encode_nodes(get_uuids(nodes))}
+        self._record["sets"].append(record)
+        set_ = TMSet(self, record)
+        self.sets.append(set_)
+        self.data._index_set(set_, set_.keys)
+        self._nodes = None
         self.save_data()
 
     def remove_set(self, name):
@@ -380,9 +1535,11 @@ class TMGroup(object):
         Remove the named set
         """
         for set_ in self.sets:
-            if set.name == name:
-                self._element.remove(set.element)
+            if set_.name == name:
+                self._record["sets"].remove(set_._record)
                 self.sets.remove(set_)
+                self.data._unindex_set(set_, set_.keys)
+                self._nodes = None
                 break
         self.save_data()
 
@@ -391,7 +1548,7 @@ class TMGroup(object):
         Set the index of the group
         """
         self.index = index
-        self._element.set("index", str(index))
+        self._record["index"] = index
         self.save_data()
 
     def set_name(self, name):
@@ -399,19 +1556,37 @@ class TMGroup(object):
         Set the name of the group
         """
         self.name = name
-        self._element.set("name", name)
+        self._record["name"] = name
         self.save_data()
 
+    def tween(self, bias):
+        """
+        Tween all sets in the group in one pass.  The bias may be a single
+        value for every set, or a dictionary of biases keyed by set name, in
+        which case sets that aren't in the dictionary are left alone.
+        """
+        if isinstance(bias, dict):
+            set_biases = [(set_.nodes, bias[set_.name]) for set_ in self.sets
+                          if set_.name in bias]
+        else:
+            set_biases = [(set_.nodes, bias) for set_ in self.sets]
+        tween_sets(set_biases)
+
     # Properties
 
     def _get_nodes(self):
         """
-        Return all nodes in all contained sets
+        Return all nodes in all contained sets.  The result is cached until a
+        set is added, removed or changed, or nodes are renamed.
         """
-        allnodes = []
-        for set_ in self.sets:
-            allnodes += set_.nodes
-        return list(set(allnodes))
+        if (self._nodes is None or not UUID_CACHE.installed
+                or self._nodes_generation != UUID_CACHE.generation):
+            allnodes = set()
+            for set_ in self.sets:
+                allnodes.update(set_.nodes)
+            self._nodes = allnodes
+            self._nodes_generation = UUID_CACHE.generation
+        return list(self._nodes)
 
     nodes = property(_get_nodes)
 
@@ -419,28 +1594,28 @@ class TMGroup(object):
 class TMSet(object):
     """
     Data class that operates on a predefined list of nodes (or no nodes, in the
-    case of the default selected set)
+    case of the default selected set).  Nodes are stored by name and UUID, and
+    the stored lists are only decoded the first time they're needed.
     """
 
-    def __init__(self, group=None, element=None):
+    def __init__(self, group=None, record=None):
         self.group = group
-        self._element = element
-        self.nodes = None
+        self._record = record
+        self._names = None
+        self._uuids = None
         self.name = None
         self.index = None
-        # If we have an element, assume that it contains the list of nodes
-        if element is not None:
-            self._nodes = element.text.split()
-            self.name = element.get("name")
-            self.index = element.get("index")
+        if record is not None:
+            self.name = record["name"]
+            self.index = record["index"]
 
     def set_index(self, index):
         """
         Set the index for this set
         """
         self.index = index
-        if self._element:
-            self._element.set("index", str(index))
+        if self._record is not None:
+            self._record["index"] = index
             self.group.save_data()
 
     def set_name(self, name):
@@ -448,8 +1623,8 @@ class TMSet(object):
         Rename this set
         """
         self.name = name
-        if self._element:
-            self._element.set("name", name)
+        if self._record is not None:
+            self._record["name"] = name
             self.group.save_data()
 
     def set_nodes(self, nodes=None):
@@ -458,13 +1633,54 @@ class TMSet(object):
         """
         # If no nodes were passed (or None was passed), default to the current selection
         if nodes is None:
-            self.nodes = mc.ls(sl=True)
-        else:
-            self.nodes = nodes
-        if self._element:
-            self._element.text = " ".join(nodes)
+            nodes = mc.ls(sl=True)
+        if self._record is not None:
+            self.group.data._unindex_set(self, self.keys)
+        self._names = list(nodes)
+        self._uuids = get_uuids(self._names)
+        if self._record is not None:
+            self.group.data._index_set(self, self.keys)
+            self.group._nodes = None
+            self._record["nodes"] = encode_nodes(self._names)
+            self._record["uuids"] = encode_nodes(self._uuids)
             self.group.save_data()
 
+    def _decode(self):
+        """
+        Decode the stored names and UUIDs if that hasn't been done yet
+        """
+        if self._names is not None or self._record is None:
+            return
+        self._names = decode_nodes(self._record["nodes"])
+        self._uuids = decode_nodes(self._record.get("uuids"))
+        # Data from earlier versions doesn't have UUIDs
+        if len(self._uuids) != len(self._names):
+            self._uuids = [""] * len(self._names)
+
+    # Properties
+
+    def _get_nodes(self):
+        """
+        Return the current names of the nodes in this set
+        """
+        self._decode()
+        if self._names is None:
+            return None
+        return UUID_CACHE.resolve(self._uuids, self._names)
+
+    def _get_keys(self):
+        """
+        Return the keys used to index the nodes of this set: the UUID of each
+        node, or its name if it doesn't have one
+        """
+        self._decode()
+        if self._names is None:
+            return []
+        return [uuid or name for uuid, name in zip(self._uuids, self._names)]
+
+    nodes = property(_get_nodes)
+    keys = property(_get_keys)
+
 
 class TMWindowUI(object):
     """
@@ -479,16 +1695,16 @@ class TMWindowUI(object):
             self.update_check()
         # First get an instance of the main data class
         self.data = TMData()
-        # Test adding a group
-        self.data.add_group("testing")
         # Set core variables
         self.docked = SETTINGS["docked"]
         self.show_mode = SETTINGS["show_mode"]
         self.use_overshoot = SETTINGS["use_overshoot"]
         self.use_special_tick = SETTINGS["use_special_tick"]
+        self.use_live_drag = SETTINGS["use_live_drag"]
+        self.use_fast_write = SETTINGS["use_fast_write"]
         self.window = None
+        self.group_uis = []
         self.set_ui_mode()
-        self._build_all_groups()
 
         # Kick off scriptJobs
         ##scriptJob -p tweenMachineWin -e "SceneOpened" "deleteUI tweenMachineWin; tweenMachine;";
@@ -512,6 +1728,12 @@ class TMWindowUI(object):
                                 resizeToFitChildren=True, sizeable=True,
                                 title="tweenMachine v%s" % __version__,
                                 docTag="tweenMachine", iconName="tweenMachine")
+        # Keep the curve and UUID caches up to date while the window is open,
+        # and clean up when it goes away.  In toolbar mode the window is the
+        # toolbar's content, so this also runs when the toolbar is closed.
+        CURVE_CACHE.install()
+        UUID_CACHE.install()
+        mc.scriptJob(uiDeleted=[self.window, self._cleanup], runOnce=True)
         # Build the base UI elements
         self.main_form = mc.formLayout(parent=self.window)
         self.selected_row = TMSetUI(self.main_form, "Selected")
@@ -519,6 +1741,18 @@ class TMWindowUI(object):
                       attachForm=[(self.selected_row.form, "top", 0),
                                   (self.selected_row.form, "left", 0),
                                   (self.selected_row.form, "right", 0)])
+        # Groups go in a scrolling column below the selected row
+        scroll = mc.scrollLayout(parent=self.main_form,
+                                 childResizable=True)
+        self.groups_layout = mc.columnLayout(parent=scroll,
+                                             adjustableColumn=True)
+        mc.formLayout(self.main_form, e=True,
+                      attachControl=[(scroll, "top", 0,
+                                      self.selected_row.form)],
+                      attachForm=[(scroll, "left", 0),
+                                  (scroll, "right", 0),
+                                  (scroll, "bottom", 0)])
+        self._build_all_groups()
 
     def _make_menus(self):
         """
@@ -638,7 +1872,7 @@ class TMWindowUI(object):
                     rb=self.show_mode == "buttons",
                     command=lambda x, m="buttons": self._set_show_mode(m))
         # UI mode options
-        if "2013" not in MAYA_VERSION:
+        if "2013" not in maya_version():
             mc.menuItem(p=self._opt_menu, divider=True)
             mode_menu = mc.menuItem(p=self._opt_menu, label="Mode...",
                                     subMenu=True)
@@ -658,6 +1892,12 @@ class TMWindowUI(object):
         mc.menuItem(p=self._opt_menu, label="Special Tick Color",
                     cb=self.use_special_tick,
                     command=self._toggle_special_tick)
+        mc.menuItem(p=self._opt_menu, label="Live Drag",
+                    cb=self.use_live_drag,
+                    command=self._toggle_live_drag)
+        mc.menuItem(p=self._opt_menu, label="Fast Write",
+                    cb=self.use_fast_write,
+                    command=self._toggle_fast_write)
 
     def open_support(self, *args):
         """
@@ -718,6 +1958,8 @@ class TMWindowUI(object):
         self.show_mode = mode
         SETTINGS["show_mode"] = mode
         self.selected_row.set_show_mode(mode)
+        for group_ui in self.group_uis:
+            group_ui.set_show_mode(mode)
 
     def _toggle_overshoot(self, *args):
         """
@@ -726,6 +1968,8 @@ class TMWindowUI(object):
         self.use_overshoot = not self.use_overshoot
         SETTINGS["use_overshoot"] = self.use_overshoot
         self.selected_row.toggle_overshoot()
+        for group_ui in self.group_uis:
+            group_ui.toggle_overshoot()
 
     def _toggle_special_tick(self, *args):
         """
@@ -734,6 +1978,20 @@ class TMWindowUI(object):
         self.use_special_tick = not self.use_special_tick
         SETTINGS["use_special_tick"] = self.use_special_tick
 
+    def _toggle_live_drag(self, *args):
+        """
+        Toggle tweening while the slider is dragged
+        """
+        self.use_live_drag = not self.use_live_drag
+        SETTINGS["use_live_drag"] = self.use_live_drag
+
+    def _toggle_fast_write(self, *args):
+        """
+        Toggle suspending viewport refresh while keys are written
+        """
+        self.use_fast_write = not self.use_fast_write
+        SETTINGS["use_fast_write"] = self.use_fast_write
+
     def _toggle_label_visibility(self, *args):
         """
         Toggle visibility of the slider label(s)
@@ -741,6 +1999,8 @@ class TMWindowUI(object):
         show = not SETTINGS["show_label"]
         SETTINGS["show_label"] = show
         self.selected_row.set_label_visibility(show)
+        for group_ui in self.group_uis:
+            group_ui.set_label_visibility(show)
 
     def _toggle_menu_visibility(self, *args):
         """
@@ -757,15 +2017,28 @@ class TMWindowUI(object):
 
     def _build_all_groups(self):
         """
-        Build the group interface(s) based on the data in the scene
+        Build the group interface(s) based on the data in the scene.  Groups
+        start collapsed, and their set rows are built when they're expanded,
+        so the window opens at the same speed however many sets there are.
         """
+        self.group_uis = [TMGroupUI(self.groups_layout, group)
+                          for group in sorted(self.data.groups,
+                                              key=lambda group: group.index)]
 
-    def _cleanup(self):
+    def _cleanup(self, *args):
         """
-        Clean up stuff when the tool is closed
+        Clean up stuff when the tool is closed (or its window is replaced when
+        the UI mode changes or the tool is reopened)
         """
         # Restore the time control to the animation list
         mc.timeControl("timeControl1", e=True, mlc="animationList")
+        # Write any data changes that are still waiting to be saved
+        self.data.flush()
+        SETTINGS.flush()
+        # Each window installed the caches once.  Their callbacks are only
+        # removed when the last tweenMachine window is gone.
+        CURVE_CACHE.uninstall()
+        UUID_CACHE.uninstall()
 
     #    def window_name(self):
     #        return find_ui("window")
@@ -793,7 +2066,7 @@ class TMWindowUI(object):
         oldmode = SETTINGS["ui_mode"]
         # If user is in Maya 2013, force window mode until a fix can be found
         # for toolbar mode
-        if "2013" in MAYA_VERSION:
+        if "2013" in maya_version():
             mode = None
             oldmode = "window"
         # Update the UI appropriately if we're changing modes
@@ -866,17 +2139,61 @@ class TMWindowUI(object):
 
     def update_check(self):
         """
-        Check for updates (or cancel update when cancel flag is set)
+        Check for updates in the background.  The result is reported once
+        it's available.
         """
-        url = "http://www.justinsbarrett.com/tmupdate.php?tmquery=version"
-        link = urllib.request.urlopen(url)
-        if link.getcode() == 200:
-            data = link.read()
-            if data.strip() != __version__:
-                mc.warning("A new version is available")
-            else:
-                print("Versions match")
-        link.close()
+        check_for_update()
+
+
+class TMGroupUI(object):
+    """
+    UI for a single group: a collapsible frame holding a TMSetUI for each set
+    in the group.  The set rows aren't built until the frame is first
+    expanded, so a collapsed group only costs one control.
+    """
+
+    def __init__(self, parent, group, collapse=True):
+        self.group = group
+        self.rows = None
+        self.frame = mc.frameLayout(parent=parent, label=group.name,
+                                    collapsable=True, collapse=collapse,
+                                    expandCommand=self.build_rows)
+        if not collapse:
+            self.build_rows()
+
+    def build_rows(self, *args):
+        """
+        Build the rows for the sets in the group, if they haven't been built
+        yet
+        """
+        if self.rows is not None:
+            return
+        column = mc.columnLayout(parent=self.frame, adjustableColumn=True)
+        self.rows = [TMSetUI(column, set_.name, data=set_)
+                     for set_ in sorted(self.group.sets,
+                                        key=lambda set_: set_.index)]
+
+    def set_show_mode(self, mode):
+        """
+        Set the show mode for the rows that have been built.  Rows built
+        later read the mode from the settings.
+        """
+        for row in self.rows or ():
+            row.set_show_mode(mode)
+
+    def set_label_visibility(self, mode):
+        """
+        Set the label visibility for the rows that have been built
+        """
+        for row in self.rows or ():
+            row.set_label_visibility(mode)
+
+    def toggle_overshoot(self):
+        """
+        Toggle overshoot for the rows that have been built
+        """
+        for row in self.rows or ():
+            row.toggle_overshoot()
 
 
 class TMSetUI(object):
@@ -885,9 +2202,10 @@ class TMSetUI(object):
     a numeric field, a check box, and a label
     """
 
-    def __init__(self, parent, name, **kwds):
-        self.data = TMSet()
+    def __init__(self, parent, name, data=None, **kwds):
+        self.data = TMSet() if data is None else data
         self.name = name
+        self.drag = None
         self.form = mc.formLayout(parent=parent)
         self.showcheck = lambda: self.data.nodes is not None
         self.checkbox = mc.checkBox(parent=self.form, label="",
@@ -899,7 +2217,7 @@ class TMSetUI(object):
                                      max=100, value=0,
                                      manage=mode in ["both", "slider"],
                                      changeCommand=self.tween_slider,
-                                     dragCommand=self.update_field)
+                                     dragCommand=self.drag_slider)
         self.field = mc.floatField(parent=self.form, min=-100, max=100, value=0,
                                    width=50, pre=1, step=1,
                                    changeCommand=self.tween_field,
@@ -954,7 +2272,29 @@ class TMSetUI(object):
         Callback when the slider value is changed
         """
         self.update_field(value)
-        self.tween(value)
+        # Releasing a live drag commits the keys made during the drag
+        if self.drag is not None:
+            drag, self.drag = self.drag, None
+            drag.finish((value + 100) / 200.0)
+        else:
+            self.tween(value)
+
+    def drag_slider(self, value):
+        """
+        Callback while the slider is dragged
+        """
+        self.update_field(value)
+        if not SETTINGS["use_live_drag"]:
+            return
+        if self.drag is None:
+            self.drag = TMDragTween(self.data.nodes)
+        try:
+            self.drag.update((value + 100) / 200.0)
+        except:
+            # Don't leave the undo chunk open if something fails
+            drag, self.drag = self.drag, None
+            drag.close()
+            raise
 
     def tween_button(self, value):
         """
@@ -1030,30 +2370,66 @@ class TMButtonRowUI(object):
         self.form = mc.formLayout(parent=parentform, height=10,
                                   nd=(10 * len(self.data)))
         self.buttons = ()
+        # (value, color, height) that each button was last built or edited
+        # with, used to find what changed when the row is refreshed
+        self._built = []
         self.refresh()
 
     def refresh(self):
         """
-        Refresh the items in the row
-        """
-        [mc.deleteUI(button) for button in self.buttons]
-        buttons = []
-        index = 0
-        for index, element in enumerate(self.data):
-            buttons.append(mc.iconTextButton(parent=self.form,
-                                             height=SETTINGS["button_height"],
-                                             backgroundColor=element.color,
-                                             # label=str((index*buttonwidth)/100.0),
-                                             style="textOnly",
-                                             command=lambda v=element.value: self.tween(v)))
-            left = (index * 10) + 1
-            right = ((index + 1) * 10) - 1
-            mc.formLayout(self.form, e=True,
-                          attachPosition=[(buttons[-1], "left", 0, left),
-                                          (buttons[-1], "right", 0, right),
-                                          (buttons[-1], "top", 0, 0)])
+        Refresh the items in the row.  Only buttons whose data changed are
+        edited, and buttons are only made or deleted when the number of
+        buttons changes.
+        """
+        height = SETTINGS["button_height"]
+        elements = [self.data.buttons[index]
+                    for index in range(len(self.data))]
+        buttons = list(self.buttons)
+        # Remove buttons that are no longer needed
+        for button in buttons[len(elements):]:
+            mc.deleteUI(button)
+        del buttons[len(elements):]
+        del self._built[len(elements):]
+        if len(elements) != len(self.buttons):
+            mc.formLayout(self.form, e=True, nd=(10 * len(elements)))
+        for index, element in enumerate(elements):
+            state = (element.value, tuple(element.color), height)
+            if index >= len(buttons):
+                buttons.append(self._make_button(index, element, height))
+                self._built.append(state)
+                continue
+            old_value, old_color, old_height = self._built[index]
+            if state == self._built[index]:
+                continue
+            button = buttons[index]
+            if element.value != old_value:
+                mc.iconTextButton(button, e=True,
+                                  command=lambda v=element.value: self.tween(v))
+            if state[1] != old_color:
+                mc.iconTextButton(button, e=True,
+                                  backgroundColor=element.color)
+            if height != old_height:
+                mc.iconTextButton(button, e=True, height=height)
+            self._built[index] = state
         self.buttons = tuple(buttons)
 
+    def _make_button(self, index, element, height):
+        """
+        Make the button for the element at the given index in the row
+        """
+        button = mc.iconTextButton(parent=self.form, height=height,
+                                   backgroundColor=element.color,
+                                   # label=str((index*buttonwidth)/100.0),
+                                   style="textOnly",
+                                   command=lambda v=element.value: self.tween(v))
+        left = (index * 10) + 1
+        right = ((index + 1) * 10) - 1
+        mc.formLayout(self.form, e=True,
+                      attachPosition=[(button, "left", 0, left),
+                                      (button, "right", 0, right),
+                                      (button, "top", 0, 0)])
+        return button
+
     def tween(self, value):
         """
         Call the tween method of the set
@@ -1120,62 +2496,169 @@ class TMButtonData(object):
 
 class TMSettings(dict):
     """
-    Convenience class to get/set global settings via an option variable
+    Convenience class to get/set global settings via an option variable.
+    The option variable is read the first time a setting is used, and
+    changes are written back once per batch, or once when Maya is idle.
     """
 
+    # Every setting and its default value
+    DEFAULTS = {"slider_width": 200,
+                "docked": False,
+                "show_mode": "both",
+                "use_overshoot": False,
+                "use_special_tick": False,
+                "default_button_data": [[-75, [0.6, 0.6, 0.6]],
+                                        [-60, [0.6, 0.6, 0.6]],
+                                        [-33, [0.6, 0.6, 0.6]],
+                                        [0, [0.6, 0.6, 0.6]],
+                                        [33, [0.6, 0.6, 0.6]],
+                                        [60, [0.6, 0.6, 0.6]],
+                                        [75, [0.6, 0.6, 0.6]]],
+                "button_height": 8,
+                "show_label": True,
+                "show_menu_bar": True,
+                "use_live_drag": False,
+                "use_fast_write": False,
+                "update_check": False,
+                "ui_mode": "window"}
+
     def __init__(self, *args, **kwds):
         dict.__init__(self, *args, **kwds)
-        # Search for existing option variable.  If it doesn't exist, make it
-        # using the default options
         self.name = "tweenMachineSettings"
+        self._loaded = False
+        self._batch_depth = 0
+        self._dirty = False
+        self._flush_pending = False
+
+    def _load(self):
+        """
+        Fill in the defaults and the saved values, if that hasn't been done
+        yet
+        """
+        if self._loaded:
+            return
+        self._loaded = True
+        # Start from the defaults, then apply any saved values
+        for key, value in self.DEFAULTS.items():
+            dict.setdefault(self, key, json.loads(json.dumps(value)))
         if mc.optionVar(exists=self.name):
-            data = eval(mc.optionVar(q=self.name))
-            for key in data:
-                self[key] = data[key]
-        # Add new items if they don't exist
-        if "use_special_tick" not in self:
-            self["special_tick"] = False
-        if "slider_width" not in self:
-            self["slider_width"] = 200
-        if "docked" not in self:
-            self["docked"] = False
-        if "show_mode" not in self:
-            self["show_mode"] = "both"
-        if "use_overshoot" not in self:
-            self["use_overshoot"] = False
-        if "use_special_tick" not in self:
-            self["use_special_tick"] = False
-        if "default_button_data" not in self:
-            self["default_button_data"] = ((-75, (0.6, 0.6, 0.6)),
-                                           (-60, (0.6, 0.6, 0.6)),
-                                           (-33, (0.6, 0.6, 0.6)),
-                                           (0, (0.6, 0.6, 0.6)),
-                                           (33, (0.6, 0.6, 0.6)),
-                                           (60, (0.6, 0.6, 0.6)),
-                                           (75, (0.6, 0.6, 0.6)))
-        if "button_height" not in self:
-            self["button_height"] = 8
-        if "show_label" not in self:
-            self["show_label"] = True
-        if "show_menu_bar" not in self:
-            self["show_menu_bar"] = True
-        if "update_check" not in self:
-            self["update_check"] = False
-        if "ui_mode" not in self:
-            self["ui_mode"] = "window"
+            data = self._parse(mc.optionVar(q=self.name))
+            # Older versions wrote this by mistake instead of use_special_tick
+            data.pop("special_tick", None)
+            dict.update(self, data)
+
+    @staticmethod
+    def _parse(text):
+        """
+        Return the settings stored in the option variable text.  Older
+        versions stored the repr of the dict rather than JSON.
+        """
+        try:
+            data = json.loads(text)
+        except ValueError:
+            try:
+                data = ast.literal_eval(text)
+            except (ValueError, SyntaxError):
+                logger.warning("Couldn't read tweenMachine settings.  Using "
+                               "the defaults.")
+                return {}
+        return data if isinstance(data, dict) else {}
+
+    def __getitem__(self, key):
+        self._load()
+        return dict.__getitem__(self, key)
+
+    def __contains__(self, key):
+        self._load()
+        return dict.__contains__(self, key)
+
+    def __iter__(self):
+        self._load()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self._load()
+        return dict.__len__(self)
+
+    def __repr__(self):
+        self._load()
+        return dict.__repr__(self)
+
+    def get(self, key, default=None):
+        self._load()
+        return dict.get(self, key, default)
+
+    def keys(self):
+        self._load()
+        return dict.keys(self)
+
+    def values(self):
+        self._load()
+        return dict.values(self)
+
+    def items(self):
+        self._load()
+        return dict.items(self)
 
     def __setitem__(self, key, value):
         """
-        Set the named item, and save the data back to the optionVar
+        Set the named item, and mark the settings as changed if it's different
         """
+        if key in self and self[key] == value:
+            return
         dict.__setitem__(self, key, value)
-        mc.optionVar(stringValue=(self.name, str(self)))
+        self.save()
+
+    def save(self):
+        """
+        Mark the settings as changed.  Inside a batch, they're written when
+        the outermost batch ends; otherwise the write is deferred until Maya
+        is idle.
+        """
+        self._dirty = True
+        if self._batch_depth or self._flush_pending:
+            return
+        self._flush_pending = True
+        mc.evalDeferred(self.flush, lowestPriority=True)
+
+    def flush(self):
+        """
+        Write the settings to the option variable, if anything changed since
+        the last write
+        """
+        self._flush_pending = False
+        if not self._dirty:
+            return
+        self._dirty = False
+        mc.optionVar(stringValue=(self.name, json.dumps(self)))
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Change several settings and write them once, when the outermost batch
+        ends
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
 
 
 # -------------------------------------------------------------------------
 # ----------------------------------------------------------- Default -----
 
+# Remove the callbacks of the caches from before the module was reloaded
+for _cache in (globals().get("CURVE_CACHE"), globals().get("UUID_CACHE")):
+    if _cache is not None:
+        _cache.uninstall(force=True)
+
 SETTINGS = TMSettings()
+CURVE_CACHE = TMCurveCache()
+UUID_CACHE = TMUuidCache()
+PROFILER = TMProfiler()
 
 if __name__ == "__main__":
     # Create a instance of the settings class, then kick off the main window
@@ -0,0 +1,273 @@
+"""
+tween_core.py
+
+description:    Maya-free core of tweenMachine.  Works on plain lists of key
+                times, values and tangent types, so the tween math can be run
+                and measured outside of a Maya session.
+
+usage:          import tools.tween_core as tween_core
+                data = tween_core.curve_data_at(keys, time)
+                values = tween_core.compute_values(data, bias)
+
+                tests/benchmark_tween.py benchmarks the core and the whole
+                tween() path.
+
+"""
+
+# -------------------------------------------------------------------------
+# ----------------------------------------------------------- Imports -----
+
+# Built-in
+import bisect
+
+
+# -------------------------------------------------------------------------
+# ----------------------------------------------------------- Globals -----
+
+# Tangent types are stored as indices into this list so that they can be
+# processed as arrays.  Types that aren't listed here (from newer versions of
+# Maya) are added by tangent_code() the first time they're seen.
+TANGENT_NAMES = ["global", "fixed", "linear", "flat", "spline", "step",
+                 "slow", "fast", "clamped", "plateau", "stepnext", "auto",
+                 "automix", "autoease", "autocustom"]
+TANGENT_CODES = dict((name, code) for code, name in enumerate(TANGENT_NAMES))
+FIXED = TANGENT_CODES["fixed"]
+STEP = TANGENT_CODES["step"]
+# NumPy module, imported the first time it's needed so that importing this
+# module stays cheap.  False until it's been looked for, None if it isn't
+# installed.
+_numpy = False
+
+
+# -------------------------------------------------------------------------
+# --------------------------------------------------------- Functions -----
+
+def neighbour_indices(times, time):
+    """
+    Return the indices of the keys before and after the given time in a
+    sorted list of key times.  Like findKeyframe, the search wraps around the
+    ends of the curve.
+    """
+    numkeys = len(times)
+    prev_index = (bisect.bisect_left(times, time) - 1) % numkeys
+    next_index = bisect.bisect_right(times, time) % numkeys
+    return prev_index, next_index
+
+
+def curve_data_at(keys, time, skip_keyed=False):
+    """
+    Build the TMCurveData for the given time from cached TMCurveKeys, finding
+    the surrounding keys of each curve by bisection.  If skip_keyed is set,
+    curves that already have a key at the time are left out.
+    """
+    data = TMCurveData()
+    for index, curve in enumerate(keys.curves):
+        times = keys.times[index]
+        if skip_keyed and (bisect.bisect_left(times, time)
+                           != bisect.bisect_right(times, time)):
+            continue
+        prev_index, next_index = neighbour_indices(times, time)
+        data.curves.append(curve)
+        data.time_prev.append(times[prev_index])
+        data.time_next.append(times[next_index])
+        data.value_prev.append(keys.values[index][prev_index])
+        data.value_next.append(keys.values[index][next_index])
+        data.in_tan_prev.append(keys.in_tangents[index][prev_index])
+        data.out_tan_prev.append(keys.out_tangents[index][prev_index])
+        data.in_tan_next.append(keys.in_tangents[index][next_index])
+        data.out_tan_next.append(keys.out_tangents[index][next_index])
+    return data
+
+
+def get_numpy():
+    """
+    Return the numpy module, or None if it isn't installed
+    """
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy as _numpy
+        except ImportError:
+            _numpy = None
+    return _numpy
+
+
+def tween_arrays(value_prev, value_next, in_tan_prev, out_tan_prev,
+                 in_tan_next, out_tan_next, bias, get_global_tangents):
+    """
+    Compute the new values and tangent codes for whole arrays of curves in
+    one call, using NumPy when it's installed and pure Python otherwise.  The
+    bias may be a single value or a sequence with one bias per curve.
+    get_global_tangents is called (at most once) to get the global (in, out)
+    tangent names.  Returns lists of the new values, in tangent codes and out
+    tangent codes.
+    """
+    if get_numpy() is not None:
+        return _tween_arrays_numpy(value_prev, value_next, in_tan_prev,
+                                   out_tan_prev, in_tan_next, out_tan_next,
+                                   bias, get_global_tangents)
+    return _tween_arrays_python(value_prev, value_next, in_tan_prev,
+                                out_tan_prev, in_tan_next, out_tan_next,
+                                bias, get_global_tangents)
+
+
+def tangent_code(name):
+    """
+    Return the code for the named tangent type, adding it to TANGENT_NAMES if
+    it hasn't been seen before
+    """
+    code = TANGENT_CODES.get(name)
+    if code is None:
+        code = len(TANGENT_NAMES)
+        TANGENT_NAMES.append(name)
+        TANGENT_CODES[name] = code
+    return code
+
+
+def _global_codes(get_global_tangents):
+    """
+    Return the global (in, out) tangent types as codes
+    """
+    return tuple(tangent_code(name) for name in get_global_tangents())
+
+
+def _tween_arrays_python(value_prev, value_next, in_tan_prev, out_tan_prev,
+                         in_tan_next, out_tan_next, bias,
+                         get_global_tangents):
+    """
+    Pure Python version of tween_arrays
+    """
+    values = []
+    in_codes = []
+    out_codes = []
+    global_codes = None
+    if isinstance(bias, (int, float)):
+        bias = [bias] * len(value_prev)
+    for index in range(len(value_prev)):
+        # Set new in and out tangent types
+        in_tan_new = out_tan_prev[index]
+        out_tan_new = in_tan_next[index]
+        # However, if any of the types (previous or next) is "fixed",
+        # use the global (default) tangent instead
+        if FIXED in (in_tan_prev[index], out_tan_prev[index],
+                     in_tan_next[index], out_tan_next[index]):
+            if global_codes is None:
+                global_codes = _global_codes(get_global_tangents)
+            in_tan_new, out_tan_new = global_codes
+        elif out_tan_next[index] == STEP:
+            out_tan_new = STEP
+        value_delta = value_next[index] - value_prev[index]
+        values.append(value_prev[index] + (value_delta * bias[index]))
+        in_codes.append(in_tan_new)
+        out_codes.append(out_tan_new)
+    return values, in_codes, out_codes
+
+
+def _tween_arrays_numpy(value_prev, value_next, in_tan_prev, out_tan_prev,
+                        in_tan_next, out_tan_next, bias, get_global_tangents):
+    """
+    NumPy version of tween_arrays
+    """
+    numpy = get_numpy()
+    value_prev = numpy.asarray(value_prev, dtype=float)
+    value_next = numpy.asarray(value_next, dtype=float)
+    bias = numpy.asarray(bias, dtype=float)
+    in_tan_prev = numpy.asarray(in_tan_prev, dtype=numpy.int8)
+    out_tan_prev = numpy.asarray(out_tan_prev, dtype=numpy.int8)
+    in_tan_next = numpy.asarray(in_tan_next, dtype=numpy.int8)
+    out_tan_next = numpy.asarray(out_tan_next, dtype=numpy.int8)
+    values = value_prev + ((value_next - value_prev) * bias)
+    # The new in tangent comes from the previous key's out tangent, and the
+    # new out tangent from the next key's in tangent, unless that key steps
+    in_codes = out_tan_prev.copy()
+    out_codes = numpy.where(out_tan_next == STEP, numpy.int8(STEP),
+                            in_tan_next)
+    # Any "fixed" tangent around the new key means using the global tangent
+    fixed = ((in_tan_prev == FIXED) | (out_tan_prev == FIXED)
+             | (in_tan_next == FIXED) | (out_tan_next == FIXED))
+    if fixed.any():
+        global_in, global_out = _global_codes(get_global_tangents)
+        in_codes[fixed] = global_in
+        out_codes[fixed] = global_out
+    return values.tolist(), in_codes.tolist(), out_codes.tolist()
+
+
+def compute_tween(data, bias, get_global_tangents):
+    """
+    Compute the new values and in/out tangent types for every curve in the
+    given TMCurveData, with a single bias or one bias per curve.  The tangent
+    types are returned as names, ready to be passed to the keyTangent
+    command.
+    """
+    values, in_codes, out_codes = tween_arrays(
+        data.value_prev, data.value_next, data.in_tan_prev, data.out_tan_prev,
+        data.in_tan_next, data.out_tan_next, bias, get_global_tangents)
+    return (values, [TANGENT_NAMES[code] for code in in_codes],
+            [TANGENT_NAMES[code] for code in out_codes])
+
+
+def compute_tangents(data, get_global_tangents):
+    """
+    Compute the new in/out tangent types for every curve in the given
+    TMCurveData.  These don't depend on the bias, so they only need to be
+    computed once per set of curves.
+    """
+    return compute_tween(data, 0.0, get_global_tangents)[1:]
+
+
+def compute_values(data, bias):
+    """
+    Compute the new value for every curve in the given TMCurveData
+    """
+    numpy = get_numpy()
+    if numpy is not None:
+        value_prev = numpy.asarray(data.value_prev, dtype=float)
+        value_next = numpy.asarray(data.value_next, dtype=float)
+        return (value_prev + ((value_next - value_prev) * bias)).tolist()
+    return [value_prev + ((value_next - value_prev) * bias)
+            for value_prev, value_next in zip(data.value_prev,
+                                              data.value_next)]
+
+
+# -------------------------------------------------------------------------
+# ----------------------------------------------------------- Classes -----
+
+class TMCurveData(object):
+    """
+    Previous/next key data for a list of anim curves, stored as parallel lists
+    so the whole batch can be processed at once.  Tangent types are stored as
+    codes from TANGENT_CODES.
+    """
+
+    def __init__(self):
+        self.curves = []
+        self.time_prev = []
+        self.time_next = []
+        self.value_prev = []
+        self.value_next = []
+        self.in_tan_prev = []
+        self.out_tan_prev = []
+        self.in_tan_next = []
+        self.out_tan_next = []
+
+    def __len__(self):
+        return len(self.curves)
+
+
+class TMCurveKeys(object):
+    """
+    Every key time, value and tangent type for a list of anim curves, so the
+    neighbouring keys of any number of frames can be found without querying
+    the curves again.  Tangent types are stored as codes from TANGENT_CODES.
+    """
+
+    def __init__(self):
+        self.curves = []
+        self.times = []
+        self.values = []
+        self.in_tangents = []
+        self.out_tangents = []
+
+    def __len__(self):
+        return len(self.curves)
+